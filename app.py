@@ -1,181 +1,104 @@
-import streamlit as st
-import pandas as pd
-from collections import defaultdict
-from io import BytesIO
-import json
+import os
+import time
 
-st.set_page_config(page_title="Excel Transaction Grouper", layout="wide")
+import streamlit as st
 
-# --- Core processing functions adapted for Streamlit ---
+from statement_core import (
+    OUTPUT_FORMATS,
+    open_source,
+    summarize_records,
+    create_output_bytes,
+    find_balance_breaks,
+    RunMetrics,
+)
 
-abbreviation = "{\"TIF Rent\":{\"Description\":\"Tiffin\",\"Category\":\"Tiffin\"},\"Ext LB\":{\"Description\":\"External Labour\",\"Category\":\"External Labour\"},\"Petrol\":{\"Description\":\"Petrol\",\"Category\":\"Transport\"},\"ptr\":{\"Description\":\"Petrol\",\"Category\":\"Transport\"},\"Tif Ptr\":{\"Description\":\"Tiffin\",\"Category\":\"Tiffin\"},\"Adv\":{\"Description\":\"Pinu\",\"Category\":\"Transport\"},\"Pinu\":{\"Description\":\"Pinu\",\"Category\":\"Transport\"},\"Bike\":{\"Description\":\"Bike\",\"Category\":\"Transport\"},\"Bharat\":{\"Description\":\"Bharat\",\"Category\":\"Bharat\"},\"Weed ptr\":{\"Description\":\"Weed Petrol\",\"Category\":\"Weed\"},\"Weed\":{\"Description\":\"Weed\",\"Category\":\"Weed\"},\"wd\":{\"Description\":\"Weed\",\"Category\":\"Weed\"},\"Tif\":{\"Description\":\"Tiffin\",\"Category\":\"Tiffin\"},\"Gas\":{\"Description\":\"Gas\",\"Category\":\"Transport\"},\"Plants\":{\"Description\":\"Plants\",\"Category\":\"Plants\"},\"Seeds\":{\"Description\":\"Seeds\",\"Category\":\"Seeds\"},\"Help\":{\"Description\":\"Helper\",\"Category\":\"Helper\"},\"Helper\":{\"Description\":\"Helper\",\"Category\":\"Helper\"},\"Nanu\":{\"Description\":\"Nanu\",\"Category\":\"Nanu\"},\"Suresh\":{\"Description\":\"Suresh\",\"Category\":\"Suresh\"},\"Jeev\":{\"Description\":\"Jeevamrut\",\"Category\":\"Fertilizer\"},\"Tempo Ptr\":{\"Description\":\"Tempo Petrol\",\"Category\":\"Transport\"}}"
+st.set_page_config(page_title="Excel Transaction Grouper", layout="wide")
 
-abbreviation_map = json.loads(abbreviation)
 
-def group_transactions_by_narration_suffix(df):
-    """
-    Group transactions by last 3 letters of narration, adapted for Streamlit.
+@st.cache_data(show_spinner=False)
+def read_statement(file_bytes, file_name):
     """
-    grouped_data = defaultdict(lambda: {'withdrawals': [], 'deposits': [], 'transactions': []})
-    
-    # Find the narration, withdrawal, and deposit columns
-    narration_col, withdrawal_col, deposit_col = None, None, None
-    
-    for col in df.columns:
-        col_lower = str(col).lower()
-        print(col_lower)
-        if 'narration' in col_lower or 'description' in col_lower or 'particulars' in col_lower:
-            narration_col = col
-        elif 'withdrawal' in col_lower or 'debit' in col_lower:
-            withdrawal_col = col
-        elif 'deposit' in col_lower or 'credit' in col_lower:
-            deposit_col = col
-        elif 'date' in col_lower:
-            date_col = col
-            
-    st.info(f"Identified Columns: Narration='{narration_col}', Withdrawal='{withdrawal_col}', Deposit='{deposit_col}', Date='{date_col}")
-
-    if not narration_col:
-        st.error("Could not automatically find the 'Narration' column. Please ensure your Excel file has a column with a name like 'Narration', 'Description', or 'Particulars'.")
-        return None
-
-    # This is the first column, which the user's logic expects to be the 'Date' column
-    # We get its name dynamically to avoid errors if it's not exactly 'Date'
-    date_column_name = df.columns[0]
-
-    # Process each transaction
-    for index, row in df.iterrows():
-        try:
-            # User-added logic to skip summary rows at the end of the statement
-            date_val = str(row[date_column_name])
-            if '****' in date_val:
-                continue
-            if "STATEMENT SUMMARY" in date_val:
-                break
-        except KeyError:
-            # Handle case where the column doesn't exist in a row, though unlikely with dataframes
-            continue
-
-        narration = str(row[narration_col]) if pd.notna(row[narration_col]) else ""
-        
-        matched_key = None
-        for key in abbreviation_map.keys():
-            if key.lower() in narration.lower():
-                matched_key = key
-                break
-
-        if matched_key:
-            group_key = matched_key
-        else:
-            group_key = "Other"
-        
-        withdrawal, deposit = 0.0, 0.0
-        date = 'NA'
-        if withdrawal_col and pd.notna(row[withdrawal_col]):
-            try:
-                withdrawal = float(str(row[withdrawal_col]).replace(',', ''))
-            except (ValueError, TypeError):
-                pass # Keep as 0 if conversion fails
-        
-        if deposit_col and pd.notna(row[deposit_col]):
-            try:
-                deposit = float(str(row[deposit_col]).replace(',', ''))
-            except (ValueError, TypeError):
-                pass # Keep as 0
-        
-        if date_col and pd.notna(row[date_col]):
-            try:
-                date = str(row[date_col])
-            except (ValueError, TypeError):
-                pass # Keep as 0
-
-        narration_key = narration.replace('-', '_')
-        data_key = f'{narration_key} - {date} - {group_key}'
-        if withdrawal > 0:
-            grouped_data[data_key]['withdrawals'] = withdrawal
-
-    return grouped_data
-
-def create_excel_output_bytes(grouped_data):
+    Parse the uploaded statement once; reruns with the same upload reuse the records.
     """
-    Creates the Excel file in memory and returns it as bytes.
-    """
-    excel_data = []
-    for data_key, data in grouped_data.items():
-        total_withdrawal = data['withdrawals']
-        group_key = data_key.split('-')[-1].strip()
-
-        if group_key in abbreviation_map:
-            description = abbreviation_map[group_key]['Description']
-            category = abbreviation_map[group_key]['Category']
-        else:
-            description = 'NA'
-            category = 'NA'
-        
-        excel_data.append({
-            'Date': data_key.split('-')[1].strip(),
-            'Narration': data_key.split('-')[0].strip(),
-            'Tag': data_key.split('-')[-1].strip(),
-            'Description': description,
-            "Category": category,
-            'Total_Withdrawal': total_withdrawal
-        })
-    
-    df_summary = pd.DataFrame(excel_data).sort_values('Date').reset_index(drop=True)
-    
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df_summary.to_excel(writer, sheet_name='Grouped_Transactions', index=False)
-        worksheet = writer.sheets['Grouped_Transactions']
-        for column in worksheet.columns:
-            col_letter = column[0].column_letter
-            header = column[0].value
-            if header == "Narration":
-                # Set a fixed width and enable text wrap
-                worksheet.column_dimensions[col_letter].width = 30  # or any width you prefer
-                for cell in column:
-                    cell.alignment = cell.alignment.copy(wrapText=True)
-            else: 
-                max_length = max(len(str(cell.value)) for cell in column if cell.value)
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
-            
-    return output.getvalue(), df_summary
+    from io import BytesIO
+
+    source = open_source(BytesIO(file_bytes), name=file_name)
+    records = source.read_all()
+    # parsed_at tells the caller whether this call parsed or came from the cache
+    stats = dict(source.stats, parsed_at=time.time())
+    return records, source.columns, getattr(source, 'reconciliation', None), stats
 
 # --- Streamlit App UI ---
 
 st.title("📂 Excel Account Statement Grouper")
-st.write("Upload your account statement in Excel format. The app will group transactions by the last 3 letters of the narration and generate a summary file for you to download.")
+st.write("Upload your account statement in Excel, CSV or PDF format. The app will group transactions by the abbreviation tag in the narration and generate a summary file for you to download.")
 
-uploaded_file = st.file_uploader("Choose an Excel file", type=["xlsx", "xls"])
+uploaded_file = st.file_uploader("Choose a statement file", type=["xlsx", "xls", "csv", "pdf"])
 
 if uploaded_file is not None:
     st.success(f"File '{uploaded_file.name}' uploaded successfully!")
 
-    # Using skiprows=20 as specified by the user's last change
     try:
-        df = pd.read_excel(uploaded_file, skiprows=20)
-        
+        metrics = RunMetrics('app')
+        read_started = time.time()
+        records, columns, reconciliation, stats = read_statement(uploaded_file.getvalue(), uploaded_file.name)
+        # Every widget change reruns the page, so by the time the button is
+        # pressed the read is always cached. Keep what the first rerun for this
+        # upload saw (cache hit or parse, and how long it took) for the run metrics.
+        reads = st.session_state.setdefault('statement_reads', {})
+        if stats['parsed_at'] not in reads:
+            reads[stats['parsed_at']] = (stats['parsed_at'] < read_started, time.time() - read_started)
+        cache_hit, read_seconds = reads[stats['parsed_at']]
+        metrics.observe('read', read_seconds)
+        metrics.record_cache('statement_cache', int(cache_hit), int(not cache_hit))
+        metrics.record_source(stats, reconciliation)
+        if columns:
+            st.info(f"Identified Columns: Narration='{columns['narration']}', Withdrawal='{columns['withdrawal']}', Deposit='{columns['deposit']}', Date='{columns['date']}'")
+        if reconciliation and reconciliation['breaks_found']:
+            st.info(f"Balance check found {reconciliation['breaks_found']} break(s) in the fast PDF parse; re-parsed {len(reconciliation['pages_reparsed'])} page(s).")
+        if reconciliation and reconciliation['lines_dropped'] > reconciliation['lines_recovered']:
+            st.warning(f"{reconciliation['lines_dropped'] - reconciliation['lines_recovered']} transaction-like line(s) in the PDF could not be parsed and are missing.")
+
+        with metrics.stage('reconcile'):
+            breaks = find_balance_breaks(records)
+        if len(breaks):
+            st.warning(f"The running balance does not reconcile at {len(breaks)} row(s), starting at row {breaks[0] + 1}. Some transactions may be missing or misread.")
+
         st.write("### Data Preview (first 5 transaction rows)")
-        st.dataframe(df.head())
+        st.dataframe(records.head())
+
+        output_format = st.selectbox(
+            "Download format",
+            list(OUTPUT_FORMATS),
+            help="xlsx is formatted for reading; CSV, Parquet and JSON Lines are much faster to generate for large statements.",
+        )
 
         if st.button("Process Transactions", type="primary"):
             with st.spinner("Analyzing and grouping transactions..."):
-                grouped_data = group_transactions_by_narration_suffix(df)
-
-                if grouped_data:
-                    excel_bytes, summary_df = create_excel_output_bytes(grouped_data)
+                metrics.inc('files')
+                metrics.record_records(records, len(breaks))
+                with metrics.stage('summarize'):
+                    summary_df = summarize_records(records, 'tag')
+                metrics.record_summary(summary_df)
+
+                if not summary_df.empty:
+                    with metrics.stage('write'):
+                        output_bytes, summary_df = create_output_bytes(summary_df, output_format)
+                    metrics.write()
                     
                     st.write("### Grouped Transactions Summary")
                     st.dataframe(summary_df)
                     
+                    extension, mime = OUTPUT_FORMATS[output_format]
                     st.download_button(
-                        label="📥 Download Processed Excel File",
-                        data=excel_bytes,
-                        file_name=f"Grouped_{uploaded_file.name}",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        label=f"📥 Download Processed {output_format.upper()} File",
+                        data=output_bytes,
+                        file_name=f"Grouped_{os.path.splitext(uploaded_file.name)[0]}{extension}",
+                        mime=mime
                     )
                 else:
+                    metrics.inc('files_failed')
+                    metrics.write()
                     st.error("Could not group transactions. Please check the file format and ensure the columns are named correctly.")
 
     except Exception as e:
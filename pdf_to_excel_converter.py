@@ -1,140 +1,195 @@
-import pandas as pd
-import pdfplumber
-import re
-from collections import defaultdict
+import argparse
 import os
 
-def extract_transactions_from_pdf(pdf_path):
+from statement_core import (
+    GROUP_MODES,
+    OUTPUT_FORMATS,
+    open_source,
+    to_record_batch,
+    summarize_records,
+    create_output,
+    write_batches,
+    output_path_for_format,
+    CheckpointManifest,
+    file_sha256,
+    iter_batches_checkpointed,
+    read_records_checkpointed,
+    find_balance_breaks,
+    RunMetrics,
+    metrics_dir,
+)
+
+DEFAULT_PDF_FILE = "Acct Statement_XX1020_19062025.pdf"
+DEFAULT_OUTPUT_FILE = "Grouped_Transactions.xlsx"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Group account statement transactions into a summary file.")
+    parser.add_argument("statement_files", nargs="*", default=[DEFAULT_PDF_FILE],
+                        help="Statements to convert (PDF, XLSX/XLS or CSV)")
+    parser.add_argument("-o", "--output",
+                        help="Output file (single input) or directory (several inputs)")
+    parser.add_argument("--group-by", choices=GROUP_MODES, default="suffix",
+                        help="Group by narration suffix or abbreviation tag, or 'none' to export "
+                             "every transaction (default: suffix)")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default="xlsx",
+                        help="Output format (default: xlsx)")
+    parser.add_argument("--checkpoint", metavar="MANIFEST",
+                        help="Checkpoint manifest (JSON). Completed inputs are skipped on rerun and "
+                             "interrupted PDFs resume from the last finished page chunk")
+    parser.add_argument("--metrics-dir", metavar="DIR",
+                        help="Where to write the run metrics (statement_cli.prom and runs.jsonl). "
+                             "Defaults to $STATEMENT_METRICS_DIR or ./metrics")
+    return parser.parse_args(argv)
+
+
+def output_path_for(statement_file, output, batch, fmt="xlsx"):
+    if not batch:
+        return output or output_path_for_format(DEFAULT_OUTPUT_FILE, fmt)
+    stem = os.path.splitext(os.path.basename(statement_file))[0]
+    return os.path.join(output or ".", f"Grouped_{stem}{OUTPUT_FORMATS[fmt][0]}")
+
+
+def report_reconciliation(source, records=None):
     """
-    Extract transaction data from PDF account statement
+    Print the PDF balance check results. Without records (streamed exports) only
+    the source's own count of remaining breaks is available.
     """
-    transactions = []
-    
+    reconciliation = getattr(source, "reconciliation", None)
+    if reconciliation and reconciliation["pages_reparsed"]:
+        pages = ", ".join(str(page + 1) for page in reconciliation["pages_reparsed"])
+        print(f"Balance check: {reconciliation['breaks_found']} break(s) in the fast parse, re-parsed page(s) {pages}")
+    if reconciliation and reconciliation["lines_dropped"] > reconciliation["lines_recovered"]:
+        lost = reconciliation["lines_dropped"] - reconciliation["lines_recovered"]
+        print(f"Warning: {lost} transaction-like line(s) could not be parsed and are missing from the output")
+
+    if records is None:
+        if reconciliation and reconciliation["unresolved_breaks"]:
+            print(f"Warning: running balance does not reconcile at {reconciliation['unresolved_breaks']} row(s)")
+        return None
+
+    breaks = find_balance_breaks(records)
+    if len(breaks):
+        rows = ", ".join(str(row + 1) for row in breaks[:10])
+        print(f"Warning: running balance does not reconcile at {len(breaks)} row(s): {rows}")
+    return breaks
+
+
+def convert_statement(statement_file, output_file, group_by="suffix", fmt="xlsx", manifest=None, metrics=None):
+    metrics = metrics or RunMetrics("cli")
+    metrics.inc("files")
+    if manifest is not None:
+        try:
+            digest = file_sha256(statement_file)
+        except OSError as e:
+            # Same report as an unreadable input without --checkpoint; nothing to record
+            print(f"Error converting statement: {e}")
+            metrics.inc("files_failed")
+            return None
+        if manifest.is_complete(statement_file, digest, output_file, group_by):
+            print(f"Skipping {statement_file}: already converted to {manifest.get(statement_file)['output']}")
+            metrics.inc("files_skipped")
+            metrics.record_cache("checkpoint", 1, 0)
+            return None
+        metrics.record_cache("checkpoint", 0, 1)
+        manifest.begin(statement_file, digest, output_file, group_by)
+
+    print(f"Extracting transactions from {statement_file}...")
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    # Split text into lines
-                    lines = text.split('\n')
-                    
-                    for line in lines:
-                        # Look for transaction patterns
-                        # This pattern may need adjustment based on actual PDF format
-                        transaction_pattern = r'^(\d{2}/\d{2}/\d{2})\s+([A-Za-z0-9\-]+)\s+(\d{16})\s+(\d{2}/\d{2}/\d{2})\s+([0-9,]+\.?\d*)\s+([0-9,]+\.?\d*)$'
-                        #transaction_pattern = r'^(\d{2}/\d{2}/\d{2})\s+([A-Za-z0-9\-\s\.]+?)\s+(\d{16})\s+(\d{2}/\d{2}/\d{2})\s+([0-9,]+\.?\d*|-)?\s+([0-9,]+\.?\d*|-)?\s+([0-9,]+\.?\d*)$'
-
-                        match = re.search(transaction_pattern, line)
-
-                        if "From" in line:
-                            print("test")
-                        
-                        if match and not "From" in line:
-                            date, narration, withdrawal, deposit, balance, _ = match.groups()
-                            
-                            # Clean up the data
-                            withdrawal = withdrawal.replace(',', '') if withdrawal != '-' else '0'
-                            deposit = deposit.replace(',', '') if deposit != '-' else '0'
-                            
-                            transactions.append({
-                                'Date': date,
-                                'Narration': narration,
-                                'Withdrawal': float(withdrawal) if withdrawal != '0' else 0,
-                                'Deposit': float(deposit) if deposit != '0' else 0,
-                                'Balance': float(balance.replace(',', ''))
-                            })
-    
+        source = open_source(statement_file)
+
+        if group_by == "none" and fmt != "xlsx":
+            # Transaction-level export: stream the source batches straight to the output
+            if manifest is not None:
+                batches = iter_batches_checkpointed(source, manifest, statement_file)
+            else:
+                batches = source.iter_batches()
+            with metrics.stage("stream"):
+                rows = write_batches(batches, output_file, fmt, empty=to_record_batch([]))
+            metrics.record_source(source.stats, getattr(source, "reconciliation", None))
+            metrics.inc("rows", rows)
+            if not rows:
+                print("No transactions found. Please check the statement format.")
+                metrics.inc("files_failed")
+                if manifest is not None:
+                    manifest.fail(statement_file, "no transactions found")
+                return None
+            print(f"Wrote {rows} transactions to {output_file}")
+            report_reconciliation(source)
+            if getattr(source, "reconciliation", None):
+                metrics.inc("balance_breaks", source.reconciliation["unresolved_breaks"])
+            if manifest is not None:
+                manifest.finish(statement_file, rows)
+            return None
+
+        with metrics.stage("read"):
+            if manifest is not None:
+                records = read_records_checkpointed(source, manifest, statement_file)
+            else:
+                records = source.read_all()
+        metrics.record_source(source.stats, getattr(source, "reconciliation", None))
+
+        if records.empty:
+            print("No transactions found. Please check the statement format.")
+            metrics.inc("files_failed")
+            if manifest is not None:
+                manifest.fail(statement_file, "no transactions found")
+            return None
+
+        print(f"Found {len(records)} transactions")
+        with metrics.stage("reconcile"):
+            breaks = report_reconciliation(source, records)
+        metrics.record_records(records, len(breaks))
+
+        print(f"Grouping transactions by {group_by}...")
+        with metrics.stage("summarize"):
+            summary_df = summarize_records(records, group_by)
+        metrics.record_summary(summary_df)
+
+        print(f"Creating {fmt} output...")
+        with metrics.stage("write"):
+            result_df = create_output(summary_df, output_file, fmt)
     except Exception as e:
-        print(f"Error reading PDF: {e}")
-        return []
-    
-    return transactions
+        print(f"Error converting statement: {e}")
+        metrics.inc("files_failed")
+        if manifest is not None:
+            manifest.fail(statement_file, e)
+        return None
 
-def group_transactions_by_narration_suffix(transactions):
-    """
-    Group transactions by last 3 letters of narration
-    """
-    grouped_data = defaultdict(lambda: {'withdrawals': [], 'deposits': []})
-    
-    for transaction in transactions:
-        narration = transaction['Narration']
-        if len(narration) >= 3:
-            suffix = narration[-3:].upper()
-            
-            if transaction['Withdrawal'] > 0:
-                grouped_data[suffix]['withdrawals'].append(transaction['Withdrawal'])
-            if transaction['Deposit'] > 0:
-                grouped_data[suffix]['deposits'].append(transaction['Deposit'])
-    
-    return grouped_data
-
-def create_excel_output(grouped_data, output_path):
-    """
-    Create Excel file with grouped transaction data
-    """
-    excel_data = []
-    
-    for suffix, data in grouped_data.items():
-        total_withdrawal = sum(data['withdrawals'])
-        total_deposit = sum(data['deposits'])
-        
-        excel_data.append({
-            'Narration_Suffix': suffix,
-            'Total_Withdrawal': total_withdrawal,
-            'Total_Deposit': total_deposit,
-            'Net_Amount': total_deposit - total_withdrawal,
-            'Transaction_Count': len(data['withdrawals']) + len(data['deposits'])
-        })
-    
-    # Create DataFrame and sort by suffix
-    df = pd.DataFrame(excel_data)
-    df = df.sort_values('Narration_Suffix')
-    
-    # Write to Excel
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Grouped_Transactions', index=False)
-        
-        # Auto-adjust column widths
-        worksheet = writer.sheets['Grouped_Transactions']
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
-    
-    return df
-
-def main():
-    pdf_file = "Acct Statement_XX1020_19062025.pdf"
-    output_file = "Grouped_Transactions.xlsx"
-    
-    print("Extracting transactions from PDF...")
-    transactions = extract_transactions_from_pdf(pdf_file)
-    
-    if not transactions:
-        print("No transactions found. Please check the PDF format.")
-        return
-    
-    print(f"Found {len(transactions)} transactions")
-    
-    print("Grouping transactions by narration suffix...")
-    grouped_data = group_transactions_by_narration_suffix(transactions)
-    
-    print("Creating Excel output...")
-    result_df = create_excel_output(grouped_data, output_file)
-    
-    print(f"Excel file created: {output_file}")
-    print(f"Total groups: {len(grouped_data)}")
-    
-    # Display summary
-    print("\nSummary:")
-    print(result_df.to_string(index=False))
+    if manifest is not None:
+        manifest.finish(statement_file, len(records))
+
+    print(f"Output file created: {output_file}")
+    print(f"Total groups: {len(result_df)}")
+    return result_df
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    batch = len(args.statement_files) > 1
+    if batch and args.output:
+        os.makedirs(args.output, exist_ok=True)
+    manifest = CheckpointManifest(args.checkpoint) if args.checkpoint else None
+    metrics = RunMetrics("cli")
+
+    for statement_file in args.statement_files:
+        result_df = convert_statement(
+            statement_file,
+            output_path_for(statement_file, args.output, batch, args.format),
+            args.group_by,
+            args.format,
+            manifest,
+            metrics,
+        )
+
+        if result_df is not None and not batch:
+            # Display summary
+            print("\nSummary:")
+            print(result_df.to_string(index=False))
+
+    summary = metrics.write(args.metrics_dir)
+    print(f"\nRun metrics: {summary['rows']} rows from {summary['files']} file(s) "
+          f"in {summary['duration_seconds']:.2f}s, written to {args.metrics_dir or metrics_dir()}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,226 +1,273 @@
+"""
+Regression corpus and throughput harness for the PDF transaction-line pattern.
+
+Run with:  python regex_pattern.py
+Every pattern (the active one in statement_core.pdf and each candidate) is run
+against a golden corpus of statement lines, with one assertion per captured
+field, and timed for throughput and worst-case per-line cost. A candidate may
+only replace the active pattern once it passes both gates, so the active
+pattern must be one of CANDIDATE_PATTERNS: the exit code is non-zero if it is
+not, or if it fails either gate.
+"""
 import re
+import sys
+import time
+
+from statement_core.pdf import transaction_pattern as ACTIVE_PATTERN
+
+# Captured fields, in group order
+FIELDS = ('date', 'narration', 'ref_no', 'value_date', 'amount', 'balance')
+
+# Performance gate: throughput relative to the active pattern, and the slowest
+# single line allowed (adversarial lines included)
+MIN_RELATIVE_THROUGHPUT = 0.8
+MAX_LINE_SECONDS = 0.002
+
+THROUGHPUT_ROUNDS = 500
+THROUGHPUT_REPEATS = 5
+WORST_CASE_ROUNDS = 20
+# Catastrophic backtracking can run for hours, so each worst-case line is timed
+# in a worker process that is killed after this long
+LINE_TIMEOUT_SECONDS = 2.0
+TIMED_OUT = 'timed out'
+
+
+def _row(date, narration, ref_no, value_date, amount, balance):
+    return dict(zip(FIELDS, (date, narration, ref_no, value_date, amount, balance)))
+
+
+# (kind, line, expected fields or None when the line must not match)
+GOLDEN_CORPUS = [
+    # Lines from real statements
+    ('match', "03/06/25 UPI-SAISAYAJI 0000105885808379 04/06/25 823.90 18,725.31",
+     _row('03/06/25', 'UPI-SAISAYAJI', '0000105885808379', '04/06/25', '823.90', '18,725.31')),
+    ('match', "04/06/25 UPI-MRSHUBHAM 0000552176269091 04/06/25 2,000.00 20,725.31",
+     _row('04/06/25', 'UPI-MRSHUBHAM', '0000552176269091', '04/06/25', '2,000.00', '20,725.31')),
+    ('match', "04/06/25 JANMAR25INSTAALERTCHG7SMS040425-MIR2 MIR2615429257739 04/06/25 1.66 20,723.65",
+     _row('04/06/25', 'JANMAR25INSTAALERTCHG7SMS040425-MIR2', 'MIR2615429257739', '04/06/25', '1.66', '20,723.65')),
+    ('match', "04/06/25 UPI-PADHYEANAND 0000552142975555 04/06/25 4,000.00 24,723.65",
+     _row('04/06/25', 'UPI-PADHYEANAND', '0000552142975555', '04/06/25', '4,000.00', '24,723.65')),
+    ('match', "04/06/25 IMPS-515511554137-GOOGLEINDIADIGITAL-UTI 0000515511554137 04/06/25 12,575.00 37,298.65",
+     _row('04/06/25', 'IMPS-515511554137-GOOGLEINDIADIGITAL-UTI', '0000515511554137', '04/06/25', '12,575.00', '37,298.65')),
+    ('match', "04/06/25 UPI-PADHYEANAND 0000552139871316 04/06/25 250.00 37,548.65",
+     _row('04/06/25', 'UPI-PADHYEANAND', '0000552139871316', '04/06/25', '250.00', '37,548.65')),
+    ('match', "05/06/25 UPI-SEEMAKEDAR 0000105957141453 05/06/25 9,000.00 32,393.65",
+     _row('05/06/25', 'UPI-SEEMAKEDAR', '0000105957141453', '05/06/25', '9,000.00', '32,393.65')),
+    ('match', "05/06/25 UPI-MRGULABDADABHAU 0000105971529423 05/06/25 440.00 31,953.65",
+     _row('05/06/25', 'UPI-MRGULABDADABHAU', '0000105971529423', '05/06/25', '440.00', '31,953.65')),
+    ('match', "07/06/25 NEFT DR-HDFC0000001-RAM KUMAR N156250012345678 07/06/25 5,000.00 26,953.65",
+     _row('07/06/25', 'NEFT DR-HDFC0000001-RAM KUMAR', 'N156250012345678', '07/06/25', '5,000.00', '26,953.65')),
+    ('match', "08/06/25 UPI-SEEDS/CO.OP@OKSBI 0000106012345678 08/06/25 1,25,000.00 1,51,953.65",
+     _row('08/06/25', 'UPI-SEEDS/CO.OP@OKSBI', '0000106012345678', '08/06/25', '1,25,000.00', '1,51,953.65')),
+
+    # Near misses: look like transactions but are not, or are malformed
+    ('near-miss', "Date Narration Chq./Ref.No. Value Dt Withdrawal Amt. Deposit Amt. Closing Balance", None),
+    ('near-miss', "From : 01/06/25 To : 30/06/25", None),
+    ('near-miss', "03/06/25 UPI-SAISAYAJI 000010588580837 04/06/25 823.90 18,725.31", None),
+    ('near-miss', "03/06/2025 UPI-SAISAYAJI 0000105885808379 04/06/2025 823.90 18,725.31", None),
+    ('near-miss', "03/06/25 UPI-SAISAYAJI 0000105885808379 04/06/25 823.90", None),
+    ('near-miss', "03/06/25 UPI-SAISAYAJI 0000105885808379 04/06/25 823.90 18,725.31 Cr", None),
+    ('near-miss', "UPI-SAISAYAJI-OKAXIS-PAYMENT FROM PHONE", None),
+    ('near-miss', "Opening Balance Dr Count Cr Count Debits Credits Closing Bal", None),
+    ('near-miss', "18,725.31 44 12 1,23,456.00 1,20,000.00 15,269.31", None),
+
+    # Adversarial long lines that make backtracking patterns blow up
+    ('adversarial', "01/06/25 " + "A " * 5000, None),
+    ('adversarial', "01/06/25 " + " " * 10000 + "x", None),
+    ('adversarial', "01/06/25 X " + "0000105885808379 04/06/25 " * 500, None),
+    ('adversarial', "01/06/25 " + "1," * 5000 + " 2.00", None),
+    ('adversarial', "01/06/25 " + "UPI-" * 3000 + " 0000105885808379 04/06/25 1.00 2.00",
+     _row('01/06/25', "UPI-" * 3000, '0000105885808379', '04/06/25', '1.00', '2.00')),
+]
+
+# Candidates for replacing ACTIVE_PATTERN. All must capture FIELDS in order.
+# Keep each pattern as it was evaluated: the active pattern is checked against
+# this table, so editing pdf.py without adding the new pattern here fails.
+CANDIDATE_PATTERNS = {
+    # Previous active pattern: drops narrations with spaces or punctuation and
+    # alphanumeric reference numbers
+    'alnum-narration': r'^(\d{2}/\d{2}/\d{2})\s+([A-Za-z0-9\-]+)\s+(\d{16})\s+(\d{2}/\d{2}/\d{2})\s+([0-9,]+\.?\d*)\s+([0-9,]+\.?\d*)$',
+    # Earlier proposal with separate optional withdrawal/deposit groups. It has one
+    # group too many and cannot match the single amount column in the text layer.
+    'optional-amounts': r'^(\d{2}/\d{2}/\d{2})\s+([A-Za-z0-9\-\s\.]+?)\s+(\d{16})\s+(\d{2}/\d{2}/\d{2})\s+([0-9,]+\.?\d*|-)?\s+([0-9,]+\.?\d*|-)?\s+([0-9,]+\.?\d*)$',
+    # Any narration, lazily matched. Correct, but backtracks badly on long lines.
+    'lazy-narration': r'^(\d{2}/\d{2}/\d{2})\s+(.+?)\s+([A-Za-z0-9]{16})\s+(\d{2}/\d{2}/\d{2})\s+([0-9,]+\.\d{2})\s+([0-9,]+\.\d{2})$',
+    # Narration as space-separated tokens, alphanumeric reference numbers
+    'token-narration': r'^(\d\d/\d\d/\d\d) ([^ ]+(?: [^ ]+)*?) ([A-Za-z0-9]{16}) (\d\d/\d\d/\d\d) ([\d,]+\.\d\d) ([\d,]+\.\d\d)$',
+}
+
 
 def get_transaction_regex_pattern():
     """
-    Returns the precise regex pattern for extracting transaction data from the PDF
+    Returns the pattern currently used for extracting transaction data from the PDF
     """
-    # Pattern explanation:
-    # ^(\d{2}/\d{2}/\d{2}) - Date in DD/MM/YY format at start of line
-    # \s+ - One or more spaces
-    # ([A-Za-z0-9\-\s\.]+?) - Narration (non-greedy match)
-    # \s+ - One or more spaces  
-    # (\d{16}) - 16-digit reference number
-    # \s+ - One or more spaces
-    # (\d{2}/\d{2}/\d{2}) - Value date
-    # \s+ - One or more spaces
-    # ([0-9,]+\.?\d*|-)? - Withdrawal amount (optional, can be dash)
-    # \s+ - One or more spaces
-    # ([0-9,]+\.?\d*|-)? - Deposit amount (optional, can be dash)
-    # \s+ - One or more spaces
-    # ([0-9,]+\.?\d*) - Closing balance
-    
-    pattern = r'^(\d{2}/\d{2}/\d{2})\s+([A-Za-z0-9\-\s\.]+?)\s+(\d{16})\s+(\d{2}/\d{2}/\d{2})\s+([0-9,]+\.?\d*|-)?\s+([0-9,]+\.?\d*|-)?\s+([0-9,]+\.?\d*)$'
-    
-    return pattern
-
-def test_regex_pattern():
+    return ACTIVE_PATTERN
+
+
+def _run_line(pattern, line, rounds):
     """
-    Test the regex pattern with sample transaction lines
+    Match one line and return (groups or None, average seconds per search).
     """
-    pattern = get_transaction_regex_pattern()
-    
-    # Sample transaction lines from the PDF
-    test_lines = [
-        "03/06/25 UPI-SAISAYAJI 0000105885808379 04/06/25 823.90 18,725.31",
-        "04/06/25 UPI-MRSHUBHAM 0000552176269091 04/06/25 2,000.00 20,725.31",
-        "04/06/25 JANMAR25INSTAALERTCHG7SMS040425-MIR2 MIR2615429257739 04/06/25 1.66 20,723.65",
-        "04/06/25 UPI-PADHYEANAND 0000552142975555 04/06/25 4,000.00 24,723.65",
-        "04/06/25 IMPS-515511554137-GOOGLEINDIADIGITAL-UTI 0000515511554137 04/06/25 12,575.00 37,298.65",
-        "04/06/25 UPI-PADHYEANAND 0000552139871316 04/06/25 250.00 37,548.65",
-        "05/06/25 UPI-SEEMAKEDAR 0000105957141453 05/06/25 9,000.00 32,393.65",
-        "05/06/25 UPI-MRGULABDADABHAU 0000105971529423 05/06/25 440.00 31,953.65"
-    ]
-    
-    print("Testing regex pattern with sample transaction lines:")
-    print("=" * 80)
-    
-    for i, line in enumerate(test_lines, 1):
-        match = re.search(pattern, line)
-        if match:
-            date, narration, ref_no, value_date, withdrawal, deposit, balance = match.groups()
-            print(f"Line {i}: MATCH")
-            print(f"  Date: {date}")
-            print(f"  Narration: {narration}")
-            print(f"  Ref No: {ref_no}")
-            print(f"  Value Date: {value_date}")
-            print(f"  Withdrawal: {withdrawal}")
-            print(f"  Deposit: {deposit}")
-            print(f"  Balance: {balance}")
-        else:
-            print(f"Line {i}: NO MATCH - {line}")
-        print()
-
-def get_improved_converter_script():
+    compiled = re.compile(pattern)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        match = compiled.search(line)
+    seconds = (time.perf_counter() - start) / rounds
+    return (match.groups() if match else None), seconds
+
+
+def run_corpus(pattern):
     """
-    Returns the improved converter script with the correct regex
+    Run every corpus line in a worker process and return one (groups, seconds)
+    per line. A line that runs past LINE_TIMEOUT_SECONDS gives (TIMED_OUT, inf)
+    and the remaining lines are not run.
     """
-    script = '''
-import pandas as pd
-import pdfplumber
-import re
-from collections import defaultdict
+    from multiprocessing import Pool, TimeoutError
 
-def extract_transactions_from_pdf(pdf_path):
+    outcomes = []
+    pool = Pool(1)
+    try:
+        for _, line, _ in GOLDEN_CORPUS:
+            # A single timed search first, so a runaway line is caught before repeating it
+            for rounds in (1, WORST_CASE_ROUNDS):
+                try:
+                    outcome = pool.apply_async(_run_line, (pattern, line, rounds)).get(LINE_TIMEOUT_SECONDS)
+                except TimeoutError:
+                    outcomes.append((TIMED_OUT, float('inf')))
+                    return outcomes
+                if outcome[1] > MAX_LINE_SECONDS:
+                    break
+            outcomes.append(outcome)
+    finally:
+        pool.terminate()
+    return outcomes
+
+
+def check_correctness(pattern, outcomes=None):
     """
-    Extract transaction data from PDF account statement with precise regex
+    Compare the corpus results with the golden fields and return a list of failure
+    messages, one per wrong field.
     """
-    transactions = []
-    
-    # Precise regex pattern for transaction lines
-    transaction_pattern = r'^(\d{2}/\d{2}/\d{2})\s+([A-Za-z0-9\-\s\.]+?)\s+(\d{16})\s+(\d{2}/\d{2}/\d{2})\s+([0-9,]+\.?\d*|-)?\s+([0-9,]+\.?\d*|-)?\s+([0-9,]+\.?\d*)$'
-    
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    lines = text.split('\\n')
-                    
-                    for line in lines:
-                        # Skip header lines
-                        if any(keyword in line.lower() for keyword in ['from :', 'to :', 'statement', 'account', 'balance brought forward', 'date narration']):
-                            continue
-                        
-                        match = re.search(transaction_pattern, line.strip())
-                        
-                        if match:
-                            date, narration, ref_no, value_date, withdrawal, deposit, balance = match.groups()
-                            
-                            # Clean up the data
-                            withdrawal = withdrawal.replace(',', '') if withdrawal and withdrawal != '-' else '0'
-                            deposit = deposit.replace(',', '') if deposit and deposit != '-' else '0'
-                            balance = balance.replace(',', '')
-                            
-                            transactions.append({
-                                'Date': date,
-                                'Narration': narration.strip(),
-                                'Ref_No': ref_no,
-                                'Value_Date': value_date,
-                                'Withdrawal': float(withdrawal) if withdrawal != '0' else 0,
-                                'Deposit': float(deposit) if deposit != '0' else 0,
-                                'Balance': float(balance)
-                            })
-    
-    except Exception as e:
-        print(f"Error reading PDF: {e}")
-        return []
-    
-    return transactions
-
-def group_transactions_by_narration_suffix(transactions):
+    groups = re.compile(pattern).groups
+    if groups != len(FIELDS):
+        return [f"pattern has {groups} groups, expected {len(FIELDS)} ({', '.join(FIELDS)})"]
+    if outcomes is None:
+        outcomes = run_corpus(pattern)
+
+    failures = []
+    for i, ((kind, line, expected), (captured, _)) in enumerate(zip(GOLDEN_CORPUS, outcomes), 1):
+        label = f"line {i} ({kind}): {line[:60]}"
+        if captured is TIMED_OUT:
+            failures.append(f"{label} timed out after {LINE_TIMEOUT_SECONDS:.0f} s")
+            break
+        if expected is None:
+            if captured is not None:
+                failures.append(f"{label} should not match")
+            continue
+        if captured is None:
+            failures.append(f"{label} did not match")
+            continue
+        for field, value in zip(FIELDS, captured):
+            if value != expected[field]:
+                failures.append(f"{label} {field}={value[:40]!r}, expected {expected[field][:40]!r}")
+    if len(outcomes) < len(GOLDEN_CORPUS) and not failures:
+        failures.append("corpus run stopped early")
+    return failures
+
+
+def measure_throughput(pattern):
     """
-    Group transactions by last 3 letters of narration
+    Return lines per second over the non-adversarial corpus lines.
     """
-    grouped_data = defaultdict(lambda: {'withdrawals': [], 'deposits': []})
-    
-    for transaction in transactions:
-        narration = transaction['Narration']
-        if len(narration) >= 3:
-            suffix = narration[-3:].upper()
-            
-            if transaction['Withdrawal'] > 0:
-                grouped_data[suffix]['withdrawals'].append(transaction['Withdrawal'])
-            if transaction['Deposit'] > 0:
-                grouped_data[suffix]['deposits'].append(transaction['Deposit'])
-    
-    return grouped_data
-
-def create_excel_output(grouped_data, output_path):
+    compiled = re.compile(pattern)
+    realistic = [line for kind, line, _ in GOLDEN_CORPUS if kind != 'adversarial']
+
+    # Best of several repeats, so a busy machine does not fail a candidate
+    best = float('inf')
+    for _ in range(THROUGHPUT_REPEATS):
+        start = time.perf_counter()
+        for _ in range(THROUGHPUT_ROUNDS):
+            for line in realistic:
+                compiled.search(line)
+        best = min(best, time.perf_counter() - start)
+    return THROUGHPUT_ROUNDS * len(realistic) / best
+
+
+def evaluate(pattern, baseline_lines_per_sec=None):
     """
-    Create Excel file with grouped transaction data
+    Run both gates and return a result dict. The throughput gate is relative to
+    baseline_lines_per_sec when given.
     """
-    excel_data = []
-    
-    for suffix, data in grouped_data.items():
-        total_withdrawal = sum(data['withdrawals'])
-        total_deposit = sum(data['deposits'])
-        
-        excel_data.append({
-            'Narration_Suffix': suffix,
-            'Total_Withdrawal': total_withdrawal,
-            'Total_Deposit': total_deposit,
-            'Net_Amount': total_deposit - total_withdrawal,
-            'Transaction_Count': len(data['withdrawals']) + len(data['deposits'])
-        })
-    
-    # Create DataFrame and sort by suffix
-    df = pd.DataFrame(excel_data)
-    df = df.sort_values('Narration_Suffix')
-    
-    # Write to Excel
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='Grouped_Transactions', index=False)
-        
-        # Auto-adjust column widths
-        worksheet = writer.sheets['Grouped_Transactions']
-        for column in worksheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            worksheet.column_dimensions[column_letter].width = adjusted_width
-    
-    return df
+    outcomes = run_corpus(pattern)
+    failures = check_correctness(pattern, outcomes)
+    lines_per_sec = measure_throughput(pattern)
+    worst = max(seconds for _, seconds in outcomes)
+
+    fast_enough = worst <= MAX_LINE_SECONDS
+    if baseline_lines_per_sec is not None:
+        fast_enough = fast_enough and lines_per_sec >= MIN_RELATIVE_THROUGHPUT * baseline_lines_per_sec
+    return {
+        'failures': failures,
+        'lines_per_sec': lines_per_sec,
+        'worst_line_seconds': worst,
+        'correct': not failures,
+        'fast_enough': fast_enough,
+    }
+
+
+def can_replace_active(candidate, active_result=None):
+    """
+    The replacement rule: a candidate may replace the active pattern only if it
+    passes the correctness gate and the performance gate relative to the active
+    pattern. Returns (allowed, result) where result is the candidate's evaluation.
+    """
+    if active_result is None:
+        active_result = evaluate(ACTIVE_PATTERN)
+    result = evaluate(candidate, active_result['lines_per_sec'])
+    return result['correct'] and result['fast_enough'], result
+
+
+def _print_result(name, result):
+    status = 'PASS' if result['correct'] and result['fast_enough'] else 'FAIL'
+    worst = result['worst_line_seconds']
+    worst_text = f"{worst * 1000:8.3f} ms" if worst != float('inf') else f"> {LINE_TIMEOUT_SECONDS:.0f} s    "
+    print(f"{name:<28} {result['lines_per_sec']:>12,.0f} lines/s  worst {worst_text}  "
+          f"correct={'yes' if result['correct'] else 'no'}  fast={'yes' if result['fast_enough'] else 'no'}  {status}")
+    for failure in result['failures'][:5]:
+        print(f"    {failure}")
+    if len(result['failures']) > 5:
+        print(f"    ... {len(result['failures']) - 5} more")
+
 
 def main():
-    pdf_file = "Acct Statement_XX1020_19062025.pdf"
-    output_file = "Grouped_Transactions.xlsx"
-    
-    print("Extracting transactions from PDF...")
-    transactions = extract_transactions_from_pdf(pdf_file)
-    
-    if not transactions:
-        print("No transactions found. Please check the PDF format.")
-        return
-    
-    print(f"Found {len(transactions)} transactions")
-    
-    # Show first few transactions for verification
-    print("\\nFirst 5 transactions:")
-    for i, t in enumerate(transactions[:5]):
-        print(f"{i+1}. {t}")
-    
-    print("\\nGrouping transactions by narration suffix...")
-    grouped_data = group_transactions_by_narration_suffix(transactions)
-    
-    print("Creating Excel output...")
-    result_df = create_excel_output(grouped_data, output_file)
-    
-    print(f"Excel file created: {output_file}")
-    print(f"Total groups: {len(grouped_data)}")
-    
-    # Display summary
-    print("\\nSummary:")
-    print(result_df.to_string(index=False))
+    print(f"Golden corpus: {len(GOLDEN_CORPUS)} lines")
+    print("=" * 100)
 
-if __name__ == "__main__":
-    main()
-'''
-    return script
+    active_name = next((name for name, pattern in CANDIDATE_PATTERNS.items() if pattern == ACTIVE_PATTERN), None)
+    active = evaluate(ACTIVE_PATTERN)
+    _print_result(f"active ({active_name or 'unlisted'})", active)
+
+    replacements = []
+    for name, pattern in CANDIDATE_PATTERNS.items():
+        if pattern == ACTIVE_PATTERN:
+            continue
+        allowed, result = can_replace_active(pattern, active)
+        _print_result(name, result)
+        if allowed:
+            replacements.append(name)
 
-if __name__ == "__main__":
-    print("Regex Pattern for Transaction Extraction:")
-    print("=" * 50)
-    print(get_transaction_regex_pattern())
     print()
-    
-    test_regex_pattern()
-    
-    print("\\nImproved Converter Script:")
-    print("=" * 50)
-    print(get_improved_converter_script()) 
\ No newline at end of file
+    if replacements:
+        print(f"May replace the active pattern: {', '.join(replacements)}")
+    else:
+        print("No candidate passes both gates; keep the active pattern.")
+
+    if active_name is None:
+        print("The active pattern in statement_core.pdf is not in CANDIDATE_PATTERNS. "
+              "Add it there and check that it passes both gates.")
+        return 1
+    return 0 if active['correct'] and active['fast_enough'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
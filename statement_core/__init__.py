@@ -0,0 +1,31 @@
+"""
+Core statement pipeline shared by the CLI converter and the Streamlit app.
+
+Heavy dependencies (pandas, pdfplumber, openpyxl) are imported inside the
+functions that need them, so importing this package stays cheap.
+"""
+from .rules import get_abbreviation_map, match_tag, describe_tag
+from .pdf import extract_transactions_from_pdf, parse_page_text, parse_page_layout
+from .sources import (
+    RECORD_COLUMNS,
+    to_record_batch,
+    StatementSource,
+    PdfSource,
+    ExcelSource,
+    CsvSource,
+    find_statement_columns,
+    open_source,
+)
+from .grouping import GROUP_MODES, summarize_by_suffix, summarize_by_tag, summarize_records
+from .output import (
+    OUTPUT_FORMATS,
+    output_path_for_format,
+    write_batches,
+    create_output,
+    create_output_bytes,
+    create_excel_output,
+    create_excel_output_bytes,
+)
+from .reconcile import find_balance_breaks, reconcile_page_rows
+from .checkpoint import CheckpointManifest, file_sha256, iter_batches_checkpointed, read_records_checkpointed
+from .metrics import RunMetrics, metrics_dir
@@ -0,0 +1,220 @@
+"""
+Checkpoint manifest for batch conversions.
+
+The manifest is a JSON file with one entry per input statement recording its
+content hash, status, output path and timing. PDF statements also record how
+many pages have been parsed; the parsed rows are kept in a spill file next to
+the manifest so a restarted run continues from the last finished page chunk
+instead of parsing the whole PDF again.
+"""
+from datetime import datetime
+import hashlib
+from itertools import islice
+import json
+import os
+import time
+
+from .sources import PdfSource, to_record_batch
+
+STATUS_IN_PROGRESS = 'in_progress'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    Return the hex SHA-256 of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class CheckpointManifest:
+    """
+    Per-input conversion state, saved to disk after every change.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.spill_dir = os.path.splitext(path)[0] + '_partial'
+        self.entries = {}
+        self._ticks = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as handle:
+                self.entries = json.load(handle).get('files', {})
+
+    @staticmethod
+    def _key(input_path):
+        return os.path.abspath(input_path)
+
+    def save(self):
+        # Write to a temp file and rename so a crash never leaves a torn manifest
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump({'files': self.entries}, handle, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, input_path):
+        return self.entries.get(self._key(input_path))
+
+    def is_complete(self, input_path, digest, output_path, group_by=None):
+        """
+        True if this exact input was already converted to the same output with the
+        same grouping, and that output still exists.
+        """
+        entry = self.get(input_path)
+        return (
+            entry is not None
+            and entry['status'] == STATUS_DONE
+            and entry['sha256'] == digest
+            and entry['output'] == os.path.abspath(output_path)
+            and entry.get('group_by') == group_by
+            and os.path.exists(entry['output'])
+        )
+
+    def spill_path(self, input_path):
+        return os.path.join(self.spill_dir, f"{self.get(input_path)['sha256'][:16]}.jsonl")
+
+    def begin(self, input_path, digest, output_path, group_by=None):
+        """
+        Start or resume an input. A changed hash or output path starts over; the
+        parsed pages do not depend on the grouping, so a new group_by keeps them.
+        """
+        key = self._key(input_path)
+        output_path = os.path.abspath(output_path)
+        entry = self.entries.get(key)
+        if entry is None or entry['sha256'] != digest or entry['output'] != output_path:
+            entry = {
+                'sha256': digest,
+                'output': output_path,
+                'started_at': _now(),
+                'finished_at': None,
+                'elapsed_seconds': 0.0,
+                'pages_done': 0,
+                'rows_done': 0,
+                'error': None,
+            }
+            self.entries[key] = entry
+            self._discard_spill(input_path)
+        entry['group_by'] = group_by
+        entry['status'] = STATUS_IN_PROGRESS
+        self._ticks[key] = time.monotonic()
+        self.save()
+        return entry
+
+    def _tick(self, input_path):
+        key = self._key(input_path)
+        now = time.monotonic()
+        entry = self.entries[key]
+        entry['elapsed_seconds'] = round(entry['elapsed_seconds'] + now - self._ticks.get(key, now), 3)
+        self._ticks[key] = now
+        return entry
+
+    def record_chunk(self, input_path, pages_done, rows_done):
+        entry = self._tick(input_path)
+        entry['pages_done'] = pages_done
+        entry['rows_done'] = rows_done
+        self.save()
+
+    def finish(self, input_path, rows):
+        entry = self._tick(input_path)
+        entry['status'] = STATUS_DONE
+        entry['rows_done'] = rows
+        entry['finished_at'] = _now()
+        entry['error'] = None
+        self.save()
+        self._discard_spill(input_path)
+
+    def fail(self, input_path, error):
+        entry = self._tick(input_path)
+        entry['status'] = STATUS_FAILED
+        entry['error'] = str(error)
+        self.save()
+
+    def _discard_spill(self, input_path):
+        if self.get(input_path) is None:
+            return
+        spill = self.spill_path(input_path)
+        if os.path.exists(spill):
+            os.remove(spill)
+
+
+def _load_spill(spill, rows_done):
+    """
+    Return the first rows_done spilled lines, or None if the spill is missing rows.
+    """
+    if rows_done == 0:
+        return []
+    if not os.path.exists(spill):
+        return None
+    # Rows written after the last saved checkpoint are dropped; those pages get parsed again
+    with open(spill, encoding='utf-8') as handle:
+        lines = list(islice(handle, rows_done))
+    if len(lines) < rows_done:
+        return None
+    return lines
+
+
+def iter_batches_checkpointed(source, manifest, input_path):
+    """
+    Yield the record batches of a source, checkpointing PDF page chunks in the
+    manifest. Rows spilled by an earlier run are yielded first, then parsing
+    continues from the last finished page chunk. Other sources are cheap to
+    re-read and are only checkpointed per file.
+    """
+    if not isinstance(source, PdfSource):
+        yield from source.iter_batches()
+        return
+
+    entry = manifest.get(input_path)
+    spill = manifest.spill_path(input_path)
+    os.makedirs(os.path.dirname(spill), exist_ok=True)
+
+    lines = _load_spill(spill, entry['rows_done'])
+    if lines is None:
+        # The spill does not match the manifest, so parse the whole PDF again
+        entry['pages_done'] = 0
+        lines = []
+    elif entry['pages_done']:
+        print(f"Resuming {input_path} at page {entry['pages_done'] + 1}")
+
+    # Keep exactly the checkpointed rows before appending new chunks
+    with open(spill, 'w', encoding='utf-8') as handle:
+        handle.writelines(lines)
+    rows_done = len(lines)
+    previous_balance = None
+    if lines:
+        spilled = to_record_batch([json.loads(line) for line in lines])
+        previous_balance = float(spilled['Balance'].iloc[-1])
+        yield spilled
+
+    for next_page, batch in source.iter_page_chunks(entry['pages_done'], previous_balance):
+        if len(batch):
+            with open(spill, 'a', encoding='utf-8') as handle:
+                for row in batch.to_dict(orient='records'):
+                    handle.write(json.dumps(row) + '\n')
+            rows_done += len(batch)
+        manifest.record_chunk(input_path, next_page, rows_done)
+        if len(batch):
+            yield batch
+
+
+def read_records_checkpointed(source, manifest, input_path):
+    """
+    Read all records from a source, checkpointing PDF page chunks in the manifest.
+    """
+    import pandas as pd
+
+    batches = list(iter_batches_checkpointed(source, manifest, input_path))
+    if not batches:
+        return to_record_batch([])
+    return pd.concat(batches, ignore_index=True)
@@ -0,0 +1,69 @@
+"""
+Grouping shared by every source. Both summaries take a record DataFrame
+(see sources.RECORD_COLUMNS) and return the summary table that gets written out.
+"""
+from .rules import match_tag, describe_tag
+
+# 'none' keeps the transaction-level records as they are
+GROUP_MODES = ('tag', 'suffix', 'none')
+
+
+def summarize_by_suffix(records):
+    """
+    Group transactions by last 3 letters of narration
+    """
+    import pandas as pd
+
+    active = records[
+        (records['Narration'].str.len() >= 3)
+        & ((records['Withdrawal'] > 0) | (records['Deposit'] > 0))
+    ]
+    withdrawals = active['Withdrawal'].where(active['Withdrawal'] > 0, 0.0)
+    deposits = active['Deposit'].where(active['Deposit'] > 0, 0.0)
+
+    grouped = pd.DataFrame({
+        'Narration_Suffix': active['Narration'].str[-3:].str.upper(),
+        'Total_Withdrawal': withdrawals,
+        'Total_Deposit': deposits,
+        'Transaction_Count': (withdrawals > 0).astype(int) + (deposits > 0).astype(int),
+    }).groupby('Narration_Suffix', as_index=False).sum()
+
+    grouped.insert(3, 'Net_Amount', grouped['Total_Deposit'] - grouped['Total_Withdrawal'])
+    return grouped.sort_values('Narration_Suffix').reset_index(drop=True)
+
+
+def summarize_by_tag(records):
+    """
+    Tag each withdrawal with the abbreviation found in its narration.
+    Repeated narration/date/tag rows keep the last withdrawal.
+    """
+    import pandas as pd
+
+    withdrawals = records[records['Withdrawal'] > 0]
+    # Narrations repeat a lot (UPI payees), so match each distinct one only once
+    tags = withdrawals['Narration'].map({n: match_tag(n) for n in withdrawals['Narration'].unique()})
+    described = {tag: describe_tag(tag) for tag in tags.unique()}
+
+    summary = pd.DataFrame({
+        'Date': withdrawals['Date'].str.strip(),
+        'Narration': withdrawals['Narration'].str.replace('-', '_', regex=False).str.strip(),
+        'Tag': tags,
+        'Description': tags.map(lambda tag: described[tag][0]),
+        'Category': tags.map(lambda tag: described[tag][1]),
+        'Total_Withdrawal': withdrawals['Withdrawal'],
+    })
+    summary = summary.drop_duplicates(subset=['Narration', 'Date', 'Tag'], keep='last')
+    return summary.sort_values('Date', kind='stable').reset_index(drop=True)
+
+
+def summarize_records(records, group_by='tag'):
+    """
+    Build the summary table for a record DataFrame using the chosen grouping.
+    """
+    if group_by == 'tag':
+        return summarize_by_tag(records)
+    if group_by == 'suffix':
+        return summarize_by_suffix(records)
+    if group_by == 'none':
+        return records
+    raise ValueError(f"Unknown grouping '{group_by}'. Expected one of: {', '.join(GROUP_MODES)}")
@@ -0,0 +1,128 @@
+"""
+Cold-start check for the entry points, based on `python -X importtime`, and a
+rerun check for the Streamlit app.
+
+Run with:  python -m statement_core.importtime [--statement FILE]
+Exits non-zero if a module goes over its budget, pulls in a heavy dependency
+that it should only load lazily, or an app rerun is slower than its budget.
+With --statement the app reruns with that file uploaded, so the timing covers
+the cached read_statement call as well as set_page_config and the page itself.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ('pandas', 'pdfplumber', 'openpyxl', 'pyarrow')
+
+# module -> (cumulative import budget in ms, whether heavy modules are allowed)
+BUDGETS = {
+    'statement_core': (150, False),
+    'pdf_to_excel_converter': (200, False),
+    'statement_core.service': (200, False),
+}
+
+# Budget for one warm rerun of app.py in ms, the latency of every widget interaction
+APP_RERUN_BUDGET_MS = 300
+APP_RERUNS = 3
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def measure_import(module):
+    """
+    Import the module in a fresh interpreter and return
+    (cumulative time in ms, list of heavy top-level modules that got imported).
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True,
+    )
+
+    total_us = 0
+    heavy = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(parts[1])
+        except ValueError:
+            continue  # header line
+        name = parts[2][1:].rstrip()
+        # Top-level entries are not indented, so they add up to the full import cost
+        if not name.startswith(' '):
+            total_us += cumulative
+        if name.strip() in HEAVY_MODULES:
+            heavy.append(name.strip())
+
+    return total_us / 1000, heavy
+
+
+def measure_app_rerun(statement=None):
+    """
+    Run app.py once with Streamlit's AppTest to warm it up, then return the best
+    of APP_RERUNS reruns in ms. Returns None if streamlit is not installed.
+    """
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return None
+    from contextlib import nullcontext
+    from io import BytesIO
+    from unittest import mock
+
+    upload = nullcontext()
+    if statement:
+        # AppTest has no file_uploader support, so hand the script the file directly
+        with open(statement, 'rb') as handle:
+            uploaded = BytesIO(handle.read())
+        uploaded.name = os.path.basename(statement)
+        upload = mock.patch('streamlit.file_uploader', return_value=uploaded)
+
+    app = AppTest.from_file(APP_PATH, default_timeout=120)
+    timings = []
+    with upload:
+        app.run()
+        for _ in range(APP_RERUNS):
+            start = time.perf_counter()
+            app.run()
+            timings.append((time.perf_counter() - start) * 1000)
+    if app.exception:
+        raise RuntimeError(f"app.py raised: {app.exception[0].value}")
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check entry point import and app rerun budgets.")
+    parser.add_argument("--statement", help="Statement file to upload for the app rerun check")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module, (budget_ms, heavy_allowed) in BUDGETS.items():
+        elapsed_ms, heavy = measure_import(module)
+        status = 'OK'
+        if elapsed_ms > budget_ms:
+            status = 'SLOW'
+        if heavy and not heavy_allowed:
+            status = 'HEAVY'
+        if status != 'OK':
+            failed = True
+
+        heavy_text = f" (imports {', '.join(heavy)})" if heavy else ''
+        print(f"{module:<28} {elapsed_ms:8.1f} ms / {budget_ms} ms  {status}{heavy_text}")
+
+    rerun_ms = measure_app_rerun(args.statement)
+    if rerun_ms is None:
+        print(f"{'app.py rerun':<28} {'-':>8}    / {APP_RERUN_BUDGET_MS} ms  SKIPPED (streamlit not installed)")
+    else:
+        status = 'OK' if rerun_ms <= APP_RERUN_BUDGET_MS else 'SLOW'
+        failed = failed or status != 'OK'
+        print(f"{'app.py rerun':<28} {rerun_ms:8.1f} ms / {APP_RERUN_BUDGET_MS} ms  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Run metrics for the converter and the Streamlit app.
+
+Each run collects counters and per-stage latencies, then writes them to
+<metrics dir>/statement_<run type>.prom in Prometheus text format (for the
+node_exporter textfile collector) and appends one line to <metrics dir>/runs.jsonl.
+The directory defaults to ./metrics and can be set with STATEMENT_METRICS_DIR.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import time
+import uuid
+
+from .rules import match_tag
+
+DEFAULT_METRICS_DIR = 'metrics'
+
+# Upper bounds in seconds for the stage latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Counters that every run reports, even when they stay at zero
+COUNTERS = (
+    'files',
+    'files_skipped',
+    'files_failed',
+    'pages',
+    'rows',
+    'bytes_read',
+    'lines_recovered',
+    'lines_unrecovered',
+    'pages_reparsed',
+    'balance_breaks',
+    'tagged_rows',
+    'other_rows',
+)
+
+
+def metrics_dir():
+    return os.environ.get('STATEMENT_METRICS_DIR', DEFAULT_METRICS_DIR)
+
+
+class RunMetrics:
+    """
+    Counters and stage timings for one conversion run.
+    """
+
+    def __init__(self, run_type):
+        self.run_type = run_type
+        self.run_id = uuid.uuid4().hex
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._start = time.monotonic()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.stages = {}
+        self.caches = {}
+        self.page_seconds = 0.0
+        self._tag_cache_start = self._tag_cache()
+
+    def inc(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage, seconds):
+        self.stages.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time a block as one observation of the named stage.
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start)
+
+    def record_cache(self, name, hits, misses):
+        cache = self.caches.setdefault(name, {'hits': 0, 'misses': 0})
+        cache['hits'] += hits
+        cache['misses'] += misses
+
+    def record_source(self, stats, reconciliation=None):
+        """
+        Add a statement source's read counters (source.stats) and reconciliation results.
+        Lines the PDF pattern rejected are split into those the layout fallback
+        recovered and those that are missing from the records.
+        """
+        for name in ('bytes_read', 'pages'):
+            self.inc(name, stats.get(name, 0))
+        self.page_seconds += stats.get('page_seconds', 0.0)
+        if reconciliation:
+            self.inc('pages_reparsed', len(reconciliation['pages_reparsed']))
+            self.inc('lines_recovered', reconciliation['lines_recovered'])
+            self.inc('lines_unrecovered', reconciliation['lines_dropped'] - reconciliation['lines_recovered'])
+        else:
+            self.inc('lines_unrecovered', stats.get('lines_dropped', 0))
+
+    def record_records(self, records, balance_breaks=0):
+        self.inc('rows', len(records))
+        self.inc('balance_breaks', balance_breaks)
+
+    def record_summary(self, summary_df):
+        """
+        Count how many rows of a tag summary fell through to the "Other" tag.
+        Other groupings have no tags, so they leave the ratio unreported.
+        """
+        if 'Tag' not in summary_df.columns:
+            return
+        self.inc('tagged_rows', len(summary_df))
+        self.inc('other_rows', int((summary_df['Tag'] == 'Other').sum()))
+
+    def _tag_cache(self):
+        # match_tag's lru_cache is process-wide, so report what this run added
+        info = match_tag.cache_info()
+        return info.hits, info.misses
+
+    def summary(self):
+        """
+        Return the run as a dict with derived rates.
+        """
+        duration = time.monotonic() - self._start
+        counters = self.counters
+
+        caches = {}
+        for name, cache in self.caches.items():
+            lookups = cache['hits'] + cache['misses']
+            caches[name] = dict(cache, hit_rate=cache['hits'] / lookups if lookups else None)
+
+        stages = {}
+        for name, values in self.stages.items():
+            ordered = sorted(values)
+            stages[name] = {
+                'count': len(values),
+                'sum': sum(values),
+                'p50': ordered[len(ordered) // 2],
+                'max': ordered[-1],
+            }
+
+        return {
+            'run_id': self.run_id,
+            'run_type': self.run_type,
+            'started_at': self.started_at,
+            'duration_seconds': duration,
+            **counters,
+            'pages_per_sec': counters['pages'] / self.page_seconds if self.page_seconds else None,
+            'rows_per_sec': counters['rows'] / duration if duration else None,
+            'other_ratio': counters['other_rows'] / counters['tagged_rows'] if counters['tagged_rows'] else None,
+            'caches': caches,
+            'stages': stages,
+        }
+
+    def prometheus_text(self, summary=None):
+        """
+        Render the run in Prometheus text exposition format.
+        """
+        summary = summary or self.summary()
+        labels = f'run_type="{self.run_type}"'
+        lines = []
+
+        def gauge(name, value, help_text, extra_labels=''):
+            if value is None:
+                return
+            lines.append(f'# HELP statement_{name} {help_text}')
+            lines.append(f'# TYPE statement_{name} gauge')
+            lines.append(f'statement_{name}{{{labels}{extra_labels}}} {value}')
+
+        gauge('run_timestamp_seconds', round(time.time(), 3), 'Unix time the last run finished.')
+        gauge('run_duration_seconds', round(summary['duration_seconds'], 6), 'Wall time of the last run.')
+        for name in COUNTERS:
+            gauge(f'run_{name}', summary[name], f'{name.replace("_", " ").capitalize()} in the last run.')
+        gauge('run_pages_per_second', summary['pages_per_sec'], 'PDF pages parsed and reconciled per second.')
+        gauge('run_rows_per_second', summary['rows_per_sec'], 'Transaction rows per second of run time.')
+        gauge('run_other_ratio', summary['other_ratio'], 'Share of tag summary rows with no abbreviation tag.')
+
+        if summary['caches']:
+            lines.append('# HELP statement_cache_hit_ratio Cache hit ratio in the last run.')
+            lines.append('# TYPE statement_cache_hit_ratio gauge')
+            for name, cache in summary['caches'].items():
+                if cache['hit_rate'] is not None:
+                    lines.append(f'statement_cache_hit_ratio{{{labels},cache="{name}"}} {cache["hit_rate"]}')
+
+        if self.stages:
+            lines.append('# HELP statement_stage_seconds Latency of each pipeline stage in the last run.')
+            lines.append('# TYPE statement_stage_seconds histogram')
+            for name, values in self.stages.items():
+                stage_labels = f'{labels},stage="{name}"'
+                for bound in LATENCY_BUCKETS:
+                    count = sum(1 for value in values if value <= bound)
+                    lines.append(f'statement_stage_seconds_bucket{{{stage_labels},le="{bound}"}} {count}')
+                lines.append(f'statement_stage_seconds_bucket{{{stage_labels},le="+Inf"}} {len(values)}')
+                lines.append(f'statement_stage_seconds_sum{{{stage_labels}}} {sum(values)}')
+                lines.append(f'statement_stage_seconds_count{{{stage_labels}}} {len(values)}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, directory=None):
+        """
+        Write the Prometheus file and append to the JSONL run log. Returns the summary.
+        """
+        hits, misses = self._tag_cache()
+        self.record_cache('match_tag', hits - self._tag_cache_start[0], misses - self._tag_cache_start[1])
+
+        directory = directory or metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        summary = self.summary()
+
+        # Rename into place so the textfile collector never reads a partial file
+        prom_path = os.path.join(directory, f'statement_{self.run_type}.prom')
+        tmp_path = prom_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            handle.write(self.prometheus_text(summary))
+        os.replace(tmp_path, prom_path)
+
+        with open(os.path.join(directory, 'runs.jsonl'), 'a', encoding='utf-8') as handle:
+            handle.write(json.dumps(summary) + '\n')
+
+        return summary
@@ -0,0 +1,215 @@
+"""
+Output layer. Summaries and transaction-level records can be written as
+xlsx, CSV, Parquet or JSON Lines. Everything except xlsx is written one
+batch at a time, so large exports do not build the whole file in memory.
+"""
+from io import BytesIO
+import os
+
+# format -> (file extension, mime type)
+OUTPUT_FORMATS = {
+    'xlsx': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('.csv', 'text/csv'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'jsonl': ('.jsonl', 'application/x-ndjson'),
+}
+
+DEFAULT_WRITE_BATCH_SIZE = 50000
+
+
+def write_summary_excel(df, target):
+    """
+    Write a summary table to an Excel file path or binary buffer
+    """
+    import pandas as pd
+
+    with pd.ExcelWriter(target, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Grouped_Transactions', index=False)
+
+        # Auto-adjust column widths
+        worksheet = writer.sheets['Grouped_Transactions']
+        for column in worksheet.columns:
+            col_letter = column[0].column_letter
+            header = column[0].value
+            if header == "Narration":
+                # Set a fixed width and enable text wrap
+                worksheet.column_dimensions[col_letter].width = 30
+                for cell in column:
+                    cell.alignment = cell.alignment.copy(wrapText=True)
+            else:
+                max_length = max(len(str(cell.value)) for cell in column if cell.value is not None)
+                worksheet.column_dimensions[col_letter].width = min(max_length + 2, 50)
+
+
+def _write_excel_batches(batches, handle):
+    import pandas as pd
+
+    # openpyxl needs the whole sheet to size the columns, so xlsx is not streamed
+    df = pd.concat(list(batches), ignore_index=True)
+    write_summary_excel(df, handle)
+    return len(df)
+
+
+def _write_csv_batches(batches, handle):
+    try:
+        from pyarrow import csv as pa_csv
+        import pyarrow as pa
+    except ImportError:
+        pa_csv = None
+
+    if pa_csv is not None:
+        # pyarrow's CSV writer is several times faster than DataFrame.to_csv
+        rows = 0
+        writer = None
+        schema = None
+        try:
+            for batch in batches:
+                if writer is None:
+                    table = pa.Table.from_pandas(batch, preserve_index=False)
+                    schema = table.schema
+                    writer = pa_csv.CSVWriter(handle, schema,
+                                              write_options=pa_csv.WriteOptions(quoting_style='needed'))
+                else:
+                    table = pa.Table.from_pandas(batch, schema=schema, preserve_index=False)
+                writer.write_table(table)
+                rows += len(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    rows = 0
+    first = True
+    for batch in batches:
+        batch.to_csv(handle, index=False, header=first)
+        first = False
+        rows += len(batch)
+    return rows
+
+
+def _write_jsonl_batches(batches, handle):
+    rows = 0
+    for batch in batches:
+        if batch.empty:
+            continue
+        text = batch.to_json(orient='records', lines=True, date_format='iso')
+        if not text.endswith('\n'):
+            text += '\n'
+        handle.write(text.encode('utf-8'))
+        rows += len(batch)
+    return rows
+
+
+def _write_parquet_batches(batches, handle):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet output needs pyarrow. Install it with 'pip install pyarrow'.")
+
+    rows = 0
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                table = pa.Table.from_pandas(batch, preserve_index=False)
+                # Text columns with no values in the first batch come back as null;
+                # write them as strings so later batches (and readers) agree
+                schema = pa.schema(
+                    [field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema],
+                    metadata=table.schema.metadata,
+                )
+                table = table.cast(schema)
+                writer = pq.ParquetWriter(handle, schema)
+            else:
+                table = pa.Table.from_pandas(batch, schema=writer.schema, preserve_index=False)
+            # One row group per batch
+            writer.write_table(table)
+            rows += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+_BATCH_WRITERS = {
+    'xlsx': _write_excel_batches,
+    'csv': _write_csv_batches,
+    'parquet': _write_parquet_batches,
+    'jsonl': _write_jsonl_batches,
+}
+
+
+def output_path_for_format(path, fmt):
+    """
+    Return the path with its extension replaced by the one for the format.
+    """
+    return os.path.splitext(path)[0] + OUTPUT_FORMATS[fmt][0]
+
+
+def iter_frame_batches(df, batch_size=DEFAULT_WRITE_BATCH_SIZE):
+    """
+    Split a DataFrame into batches. An empty frame is yielded once so the header is kept.
+    """
+    if df.empty:
+        yield df
+        return
+    for start in range(0, len(df), batch_size):
+        yield df.iloc[start:start + batch_size]
+
+
+def _or_empty(batches, empty):
+    yielded = False
+    for batch in batches:
+        yielded = True
+        yield batch
+    if not yielded:
+        yield empty
+
+
+def write_batches(batches, target, fmt='xlsx', empty=None):
+    """
+    Write an iterable of DataFrame batches to a path or binary buffer.
+    If `batches` turns out to be empty, the `empty` frame is written instead so
+    the file still has its header or schema. Returns the number of rows written.
+    """
+    if fmt not in _BATCH_WRITERS:
+        raise ValueError(f"Unknown output format '{fmt}'. Expected one of: {', '.join(OUTPUT_FORMATS)}")
+    if empty is not None:
+        batches = _or_empty(batches, empty)
+
+    if hasattr(target, 'write'):
+        return _BATCH_WRITERS[fmt](batches, target)
+    with open(target, 'wb') as handle:
+        return _BATCH_WRITERS[fmt](batches, handle)
+
+
+def create_output(summary_df, output_path, fmt='xlsx'):
+    """
+    Write a summary table to a file in the chosen format
+    """
+    write_batches(iter_frame_batches(summary_df), output_path, fmt)
+    return summary_df
+
+
+def create_output_bytes(summary_df, fmt='xlsx'):
+    """
+    Write a summary table in memory and return (bytes, summary_df)
+    """
+    output = BytesIO()
+    write_batches(iter_frame_batches(summary_df), output, fmt)
+    return output.getvalue(), summary_df
+
+
+def create_excel_output(summary_df, output_path):
+    """
+    Create Excel file with grouped transaction data
+    """
+    return create_output(summary_df, output_path, 'xlsx')
+
+
+def create_excel_output_bytes(summary_df):
+    """
+    Creates the Excel file in memory and returns it as bytes.
+    """
+    return create_output_bytes(summary_df, 'xlsx')
@@ -0,0 +1,162 @@
+import re
+
+# Date, narration, reference number, value date, amount, closing balance.
+# The text layer has a single amount column; whether it was a withdrawal or a
+# deposit is decided from the balance movement (see _split_amount).
+# A replacement must be listed in regex_pattern.CANDIDATE_PATTERNS and pass
+# `python regex_pattern.py`, which fails while this pattern is not listed there.
+transaction_pattern = r'^(\d\d/\d\d/\d\d) ([^ ]+(?: [^ ]+)*?) ([A-Za-z0-9]{16}) (\d\d/\d\d/\d\d) ([\d,]+\.\d\d) ([\d,]+\.\d\d)$'
+
+# Looser line pattern for the layout fallback, which joins words with single
+# spaces: any reference number token, not just 16 alphanumerics
+fallback_pattern = r'^(\d\d/\d\d/\d\d) ([^ ]+(?: [^ ]+)*?) ([^ ]+) (\d\d/\d\d/\d\d) ([\d,]+\.\d\d) ([\d,]+\.\d\d)$'
+
+_transaction_re = re.compile(transaction_pattern)
+# Any line starting with a date looks like a transaction row
+_date_line_re = re.compile(r'^\d\d/\d\d/\d\d ')
+_fallback_re = re.compile(fallback_pattern)
+
+# Words on the same text line can differ slightly in their top coordinate
+_LINE_TOLERANCE = 3
+
+
+def _to_float(value):
+    return float(value.replace(',', ''))
+
+
+def _split_amount(amount, balance, previous_balance):
+    """
+    Return (withdrawal, deposit) for an unsigned amount. A rising balance means a
+    deposit; with no previous balance (first row of a statement) assume a withdrawal.
+    """
+    if previous_balance is not None and balance > previous_balance:
+        return 0.0, amount
+    return amount, 0.0
+
+
+def parse_page_text(text, previous_balance=None, stats=None):
+    """
+    Parse the transaction lines out of one page of extracted PDF text.
+    previous_balance is the closing balance of the row before this page. If a
+    stats dict is given, date-led lines the pattern rejects are counted in
+    stats['lines_dropped'].
+    """
+    transactions = []
+    if not text:
+        return transactions
+
+    # Split text into lines
+    for line in text.split('\n'):
+        # Look for transaction patterns
+        match = _transaction_re.search(line)
+
+        if match and not "From" in line:
+            date, narration, _ref_no, _value_date, amount, balance = match.groups()
+            balance = _to_float(balance)
+            withdrawal, deposit = _split_amount(_to_float(amount), balance, previous_balance)
+
+            transactions.append({
+                'Date': date,
+                'Narration': narration,
+                'Withdrawal': withdrawal,
+                'Deposit': deposit,
+                'Balance': balance
+            })
+            previous_balance = balance
+        elif stats is not None and _date_line_re.match(line):
+            stats['lines_dropped'] += 1
+
+    return transactions
+
+
+def _group_words_into_lines(words):
+    lines = []
+    for word in sorted(words, key=lambda w: (round(w['top']), w['x0'])):
+        if lines and abs(word['top'] - lines[-1][0]['top']) <= _LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w['x0']) for line in lines]
+
+
+def _find_amount_columns(lines):
+    """
+    Return the right edges of the Withdrawal and Deposit headers, or None if this
+    page has no header row.
+    """
+    for line in lines:
+        edges = {}
+        for word in line:
+            text = word['text'].lower()
+            if text.startswith('withdrawal'):
+                edges['withdrawal'] = word['x1']
+            elif text.startswith('deposit'):
+                edges['deposit'] = word['x1']
+        if len(edges) == 2:
+            return edges
+    return None
+
+
+def parse_page_layout(page, previous_balance=None, columns=None):
+    """
+    Slower fallback for one pdfplumber page. Rebuilds lines from word positions,
+    uses a looser line pattern, and places the amount in the withdrawal or deposit
+    column by its x position under the header. Pages without a header use
+    `columns` from an earlier page, or the balance movement if that is None too.
+    Returns (transactions, columns), where columns are the header positions to
+    pass on to the next page.
+    """
+    lines = _group_words_into_lines(page.extract_words())
+    columns = _find_amount_columns(lines) or columns
+
+    transactions = []
+    for words in lines:
+        match = _fallback_re.match(' '.join(word['text'] for word in words))
+        if not match:
+            continue
+
+        date, narration, _ref_no, _value_date, amount, balance = match.groups()
+        amount, balance = _to_float(amount), _to_float(balance)
+        if columns is not None:
+            # Amounts are right-aligned, so compare right edges
+            amount_x1 = words[-2]['x1']
+            if abs(amount_x1 - columns['deposit']) < abs(amount_x1 - columns['withdrawal']):
+                withdrawal, deposit = 0.0, amount
+            else:
+                withdrawal, deposit = amount, 0.0
+        else:
+            withdrawal, deposit = _split_amount(amount, balance, previous_balance)
+
+        transactions.append({
+            'Date': date,
+            'Narration': narration.strip(),
+            'Withdrawal': withdrawal,
+            'Deposit': deposit,
+            'Balance': balance
+        })
+        previous_balance = balance
+
+    return transactions, columns
+
+
+def extract_transactions_from_pdf(pdf_path, start_page=0, end_page=None):
+    """
+    Extract transaction data from PDF account statement.
+    start_page/end_page limit extraction to a slice of pages.
+    """
+    # pdfplumber is slow to import, so only load it when a PDF is actually read
+    import pdfplumber
+
+    transactions = []
+
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages[start_page:end_page]:
+                previous_balance = transactions[-1]['Balance'] if transactions else None
+                transactions.extend(parse_page_text(page.extract_text(), previous_balance))
+
+    except Exception as e:
+        print(f"Error reading PDF: {e}")
+        return []
+
+    return transactions
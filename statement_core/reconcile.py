@@ -0,0 +1,121 @@
+"""
+Running-balance reconciliation.
+
+Every statement row carries its closing balance, so the balance column must
+equal the opening balance plus the cumulative sum of deposits minus
+withdrawals. Rows where that chain breaks were dropped or misparsed; for PDFs
+only the pages around those rows are parsed again with the slower layout
+extractor.
+"""
+
+
+def find_balance_breaks(records, opening_balance=None):
+    """
+    Return the row positions where the running balance does not follow from the
+    previous row. Without an opening balance the first row is taken as correct.
+    Rows without a parsed balance are not checked.
+    """
+    import numpy as np
+
+    if records.empty:
+        return np.array([], dtype=int)
+
+    # Work in paise so the cumulative sum is exact
+    balance = np.rint(records['Balance'].to_numpy(dtype=float) * 100)
+    net = np.rint((records['Deposit'].to_numpy(dtype=float) - records['Withdrawal'].to_numpy(dtype=float)) * 100)
+    has_balance = ~np.isnan(balance)
+    if not has_balance.any():
+        return np.array([], dtype=int)
+
+    if opening_balance is None:
+        first = np.argmax(has_balance)
+        opening = balance[first] - net[:first + 1].sum()
+    else:
+        opening = round(opening_balance * 100)
+
+    residual = balance - (opening + np.cumsum(net))
+    # Carry the last known residual over rows with no balance, then look for jumps
+    residual = np.where(has_balance, residual, np.nan)
+    filled = _forward_fill(residual)
+    steps = np.diff(filled, prepend=0.0)
+    return np.flatnonzero(has_balance & (np.abs(steps) >= 1))
+
+
+def _forward_fill(values):
+    import numpy as np
+
+    index = np.where(~np.isnan(values), np.arange(len(values)), 0)
+    np.maximum.accumulate(index, out=index)
+    filled = values[index]
+    return np.where(np.isnan(filled), 0.0, filled)
+
+
+def reconcile_page_rows(page_rows, reparse_page, previous_balance=None, dropped_lines=None):
+    """
+    Check the rows parsed from consecutive pages and re-parse the pages around
+    every break with `reparse_page(page_index, previous_balance)`.
+
+    page_rows is a list with one list of transaction dicts per page. dropped_lines
+    optionally gives, per page, the date-led lines the fast parse rejected; those
+    pages are re-parsed too, which catches rows lost where no later balance shows
+    a break, such as the last row of a statement. A re-parsed page is only kept
+    if it has at least as many rows and leaves no more breaks than before.
+
+    Returns (page_rows, report) where report has the breaks found by the fast
+    parse, the page indexes that were re-parsed, the breaks that remain, the
+    dropped and recovered lines, and per-page lists of the remaining breaks and
+    recovered lines (unresolved_by_page, recovered_by_page).
+    """
+    import numpy as np
+    from .sources import to_record_batch
+
+    def check(rows_per_page):
+        records = to_record_batch([row for rows in rows_per_page for row in rows])
+        pages = np.repeat(np.arange(len(rows_per_page)), [len(rows) for rows in rows_per_page])
+        return pages[find_balance_breaks(records, previous_balance)]
+
+    def per_page(break_pages):
+        return np.bincount(break_pages, minlength=len(page_rows)).tolist()
+
+    dropped_lines = list(dropped_lines or [0] * len(page_rows))
+    break_pages = check(page_rows)
+    report = {
+        'breaks_found': len(break_pages),
+        'pages_reparsed': [],
+        'unresolved_breaks': len(break_pages),
+        'lines_dropped': sum(dropped_lines),
+        'lines_recovered': 0,
+        'unresolved_by_page': per_page(break_pages),
+        'recovered_by_page': [0] * len(page_rows),
+    }
+
+    # A dropped row sits either on the break's page or at the end of the page before it
+    suspect = set(break_pages.tolist())
+    suspect.update((break_pages[break_pages > 0] - 1).tolist())
+    suspect.update(index for index, count in enumerate(dropped_lines) if count)
+    if previous_balance is None and page_rows:
+        # Nothing before the first row, so its withdrawal/deposit side cannot be
+        # inferred from the balance; the layout parse reads it from the column
+        suspect.add(0)
+    if not suspect:
+        return page_rows, report
+
+    fixed = list(page_rows)
+    balance = previous_balance
+    for index in range(len(fixed)):
+        if index in suspect:
+            rows = reparse_page(index, balance)
+            report['pages_reparsed'].append(index)
+            trial = fixed[:index] + [rows] + fixed[index + 1:]
+            trial_breaks = check(trial)
+            if len(rows) >= len(fixed[index]) and len(trial_breaks) <= len(break_pages):
+                recovered = min(dropped_lines[index], len(rows) - len(fixed[index]))
+                report['recovered_by_page'][index] = recovered
+                report['lines_recovered'] += recovered
+                fixed, break_pages = trial, trial_breaks
+        if fixed[index]:
+            balance = fixed[index][-1]['Balance']
+
+    report['unresolved_breaks'] = len(break_pages)
+    report['unresolved_by_page'] = per_page(break_pages)
+    return fixed, report
@@ -0,0 +1,42 @@
+from functools import lru_cache
+import json
+
+# Tag rules: narration keyword -> Description / Category used in the summary
+abbreviation = "{\"TIF Rent\":{\"Description\":\"Tiffin\",\"Category\":\"Tiffin\"},\"Ext LB\":{\"Description\":\"External Labour\",\"Category\":\"External Labour\"},\"Petrol\":{\"Description\":\"Petrol\",\"Category\":\"Transport\"},\"ptr\":{\"Description\":\"Petrol\",\"Category\":\"Transport\"},\"Tif Ptr\":{\"Description\":\"Tiffin\",\"Category\":\"Tiffin\"},\"Adv\":{\"Description\":\"Pinu\",\"Category\":\"Transport\"},\"Pinu\":{\"Description\":\"Pinu\",\"Category\":\"Transport\"},\"Bike\":{\"Description\":\"Bike\",\"Category\":\"Transport\"},\"Bharat\":{\"Description\":\"Bharat\",\"Category\":\"Bharat\"},\"Weed ptr\":{\"Description\":\"Weed Petrol\",\"Category\":\"Weed\"},\"Weed\":{\"Description\":\"Weed\",\"Category\":\"Weed\"},\"wd\":{\"Description\":\"Weed\",\"Category\":\"Weed\"},\"Tif\":{\"Description\":\"Tiffin\",\"Category\":\"Tiffin\"},\"Gas\":{\"Description\":\"Gas\",\"Category\":\"Transport\"},\"Plants\":{\"Description\":\"Plants\",\"Category\":\"Plants\"},\"Seeds\":{\"Description\":\"Seeds\",\"Category\":\"Seeds\"},\"Help\":{\"Description\":\"Helper\",\"Category\":\"Helper\"},\"Helper\":{\"Description\":\"Helper\",\"Category\":\"Helper\"},\"Nanu\":{\"Description\":\"Nanu\",\"Category\":\"Nanu\"},\"Suresh\":{\"Description\":\"Suresh\",\"Category\":\"Suresh\"},\"Jeev\":{\"Description\":\"Jeevamrut\",\"Category\":\"Fertilizer\"},\"Tempo Ptr\":{\"Description\":\"Tempo Petrol\",\"Category\":\"Transport\"}}"
+
+
+@lru_cache(maxsize=None)
+def get_abbreviation_map():
+    """
+    Parse the tag rules once per process and return the cached mapping.
+    """
+    return json.loads(abbreviation)
+
+
+@lru_cache(maxsize=None)
+def _lowered_keys():
+    # Keys are matched case-insensitively in rule order, so lower them once
+    return tuple((key, key.lower()) for key in get_abbreviation_map())
+
+
+@lru_cache(maxsize=4096)
+def match_tag(narration):
+    """
+    Return the first abbreviation key found in the narration, or "Other".
+    Payee narrations repeat across statements, so results are cached.
+    """
+    narration_lower = narration.lower()
+    for key, key_lower in _lowered_keys():
+        if key_lower in narration_lower:
+            return key
+    return "Other"
+
+
+def describe_tag(group_key):
+    """
+    Return (description, category) for a tag, or ('NA', 'NA') if it is unknown.
+    """
+    rule = get_abbreviation_map().get(group_key)
+    if rule is None:
+        return 'NA', 'NA'
+    return rule['Description'], rule['Category']
@@ -0,0 +1,351 @@
+"""
+Local HTTP API for statement conversion.
+
+Run with:  python -m statement_core.service [--port 8765] [--workers N]
+
+    POST /jobs?name=statement.pdf&group_by=tag&format=xlsx   body: the raw file
+        -> 202 {"id": ..., "status": "queued", ...}
+    GET  /jobs/<id>          -> job status
+    GET  /jobs/<id>/result   -> the converted file once the job is done
+    GET  /health             -> workers, capacity and jobs in flight
+
+Conversions run in one shared pool of worker processes, so clients do not each
+start their own Python process and pay the pandas/pdfplumber import. At most
+workers + max_queue jobs are accepted at a time; past that a submit gets 503.
+An upload identical to a job that is still queued or running (same content
+hash and options) returns that job instead of converting the file again.
+"""
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from urllib.parse import parse_qs, quote, urlsplit
+import uuid
+
+from .grouping import GROUP_MODES
+from .output import OUTPUT_FORMATS
+from .sources import SOURCES
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUE = 16
+DEFAULT_MAX_UPLOAD_MB = 50
+# Finished jobs kept for polling and download before the oldest are dropped
+MAX_FINISHED_JOBS = 100
+
+
+def _warm_worker():
+    # Pay the heavy imports once per worker process, not on its first job
+    import pandas  # noqa: F401
+    import pdfplumber  # noqa: F401
+    import openpyxl  # noqa: F401
+
+
+def convert_bytes(data, name, group_by='tag', fmt='xlsx'):
+    """
+    Convert one uploaded statement in a worker process.
+    Returns (output bytes, transaction count, summary row count).
+    """
+    from io import BytesIO
+    from .sources import open_source
+    from .grouping import summarize_records
+    from .output import create_output_bytes
+
+    records = open_source(BytesIO(data), name=name).read_all()
+    if records.empty:
+        raise ValueError("No transactions found. Please check the statement format.")
+    output_bytes, summary_df = create_output_bytes(summarize_records(records, group_by), fmt)
+    return output_bytes, len(records), len(summary_df)
+
+
+def _content_disposition(filename):
+    """
+    Build an attachment header: a plain ASCII filename for old clients and the
+    full name as RFC 6266 filename*.
+    """
+    fallback = re.sub(r'[^A-Za-z0-9._ -]', '_', filename)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+class ConversionService:
+    """
+    Job table in front of a bounded process pool.
+    """
+
+    def __init__(self, workers=None, max_queue=DEFAULT_MAX_QUEUE):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.executor = self._new_pool()
+        self.slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+        self.in_flight = {}
+
+    def _new_pool(self):
+        # The HTTP server is threaded, so start workers with spawn rather than
+        # forking a process that has other threads running
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_warm_worker,
+        )
+
+    def submit(self, data, name, group_by='tag', fmt='xlsx'):
+        """
+        Queue a conversion and return (job, deduplicated). Returns (None, False)
+        when the pool and its queue are full. Raises BrokenProcessPool if the
+        pool broke and the restarted pool could not take the job either.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        key = (digest, os.path.splitext(name)[1].lower(), group_by, fmt)
+
+        with self.lock:
+            job_id = self.in_flight.get(key)
+            if job_id is not None:
+                job = self.jobs[job_id]
+                job['duplicates'] += 1
+                return job, True
+
+            if not self.slots.acquire(blocking=False):
+                return None, False
+
+            try:
+                future = self._submit_to_pool(data, name, group_by, fmt)
+            except BrokenProcessPool:
+                self.slots.release()
+                raise
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'name': name,
+                'sha256': digest,
+                'group_by': group_by,
+                'format': fmt,
+                'submitted_at': time.time(),
+                'finished_at': None,
+                'duplicates': 0,
+                'error': None,
+                'transactions': None,
+                'groups': None,
+                'future': future,
+                'output': None,
+            }
+            self.jobs[job['id']] = job
+            self.in_flight[key] = job['id']
+
+        job['future'].add_done_callback(lambda future: self._finish(job, key, future))
+        return job, False
+
+    def _submit_to_pool(self, data, name, group_by, fmt):
+        try:
+            return self.executor.submit(convert_bytes, data, name, group_by, fmt)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory) and took the pool with it.
+            # Jobs already queued on it fail through their futures; start a new
+            # pool and give this job one try on it.
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._new_pool()
+            return self.executor.submit(convert_bytes, data, name, group_by, fmt)
+
+    def _finish(self, job, key, future):
+        try:
+            job['output'], job['transactions'], job['groups'] = future.result()
+        except Exception as e:
+            job['error'] = str(e) or type(e).__name__
+        job['finished_at'] = time.time()
+
+        with self.lock:
+            self.in_flight.pop(key, None)
+            self.slots.release()
+            self._drop_old_jobs()
+
+    def _drop_old_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['finished_at'] is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    @staticmethod
+    def status(job):
+        if job['finished_at'] is not None:
+            return 'failed' if job['error'] else 'done'
+        future = job['future']
+        return 'running' if future is not None and future.running() else 'queued'
+
+    def describe(self, job):
+        """
+        Return the JSON-safe view of a job.
+        """
+        view = {key: job[key] for key in (
+            'id', 'name', 'sha256', 'group_by', 'format', 'submitted_at', 'finished_at',
+            'duplicates', 'error', 'transactions', 'groups',
+        )}
+        view['status'] = self.status(job)
+        if view['status'] == 'done':
+            view['result'] = f"/jobs/{job['id']}/result"
+        return view
+
+    def health(self):
+        with self.lock:
+            in_flight = len(self.in_flight)
+            finished = len(self.jobs) - in_flight
+        return {
+            'workers': self.workers,
+            'capacity': self.workers + self.max_queue,
+            'in_flight': in_flight,
+            'finished': finished,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ConversionHandler(BaseHTTPRequestHandler):
+    """
+    Routes requests to the server's ConversionService.
+    """
+
+    server_version = 'StatementService/1.0'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(status, {'error': message}, headers)
+
+    def do_GET(self):
+        parts = urlsplit(self.path).path.strip('/').split('/')
+
+        if parts == ['health']:
+            return self.send_json(HTTPStatus.OK, self.service.health())
+
+        if len(parts) not in (2, 3) or parts[0] != 'jobs' or (len(parts) == 3 and parts[2] != 'result'):
+            return self.send_error_json(HTTPStatus.NOT_FOUND, f"Unknown path: {self.path}")
+
+        job = self.service.get(parts[1])
+        if job is None:
+            return self.send_error_json(HTTPStatus.NOT_FOUND, f"Unknown job: {parts[1]}")
+        if len(parts) == 2:
+            return self.send_json(HTTPStatus.OK, self.service.describe(job))
+
+        status = self.service.status(job)
+        if status == 'failed':
+            return self.send_error_json(HTTPStatus.UNPROCESSABLE_ENTITY, job['error'])
+        if status != 'done':
+            return self.send_error_json(HTTPStatus.CONFLICT, f"Job is {status}", {'Retry-After': '1'})
+
+        extension, mime = OUTPUT_FORMATS[job['format']]
+        stem = os.path.splitext(os.path.basename(job['name']))[0]
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', mime)
+        self.send_header('Content-Length', str(len(job['output'])))
+        self.send_header('Content-Disposition', _content_disposition(f"Grouped_{stem}{extension}"))
+        self.end_headers()
+        self.wfile.write(job['output'])
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') != '/jobs':
+            return self.send_error_json(HTTPStatus.NOT_FOUND, f"Unknown path: {self.path}")
+
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        name = query.get('name', '')
+        group_by = query.get('group_by', 'tag')
+        fmt = query.get('format', 'xlsx')
+
+        if any(char == '"' or char == '\\' or not char.isprintable() for char in name):
+            return self.send_error_json(
+                HTTPStatus.BAD_REQUEST, "name must not contain quotes, backslashes or control characters",
+            )
+        if os.path.splitext(name)[1].lower() not in SOURCES:
+            return self.send_error_json(
+                HTTPStatus.BAD_REQUEST,
+                f"name must be a file name ending in one of: {', '.join(SOURCES)}",
+            )
+        if group_by not in GROUP_MODES:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, f"group_by must be one of: {', '.join(GROUP_MODES)}")
+        if fmt not in OUTPUT_FORMATS:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, f"format must be one of: {', '.join(OUTPUT_FORMATS)}")
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self.close_connection = True
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, "Content-Length must be a number")
+        if length <= 0:
+            return self.send_error_json(HTTPStatus.LENGTH_REQUIRED, "Send the statement file as the request body")
+        if length > self.server.max_upload_bytes:
+            # The body is not read, so the connection cannot be reused
+            self.close_connection = True
+            return self.send_error_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Statement file is too large")
+
+        try:
+            job, deduplicated = self.service.submit(self.rfile.read(length), name, group_by, fmt)
+        except BrokenProcessPool:
+            return self.send_error_json(
+                HTTPStatus.SERVICE_UNAVAILABLE, "Conversion workers are restarting", {'Retry-After': '5'},
+            )
+        if job is None:
+            return self.send_error_json(HTTPStatus.SERVICE_UNAVAILABLE, "Conversion queue is full", {'Retry-After': '5'})
+
+        body = dict(self.service.describe(job), deduplicated=deduplicated)
+        self.send_json(HTTPStatus.ACCEPTED, body, {'Location': f"/jobs/{job['id']}"})
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, max_queue=DEFAULT_MAX_QUEUE,
+                max_upload_mb=DEFAULT_MAX_UPLOAD_MB):
+    server = ThreadingHTTPServer((host, port), ConversionHandler)
+    server.service = ConversionService(workers, max_queue)
+    server.max_upload_bytes = max_upload_mb * 1024 * 1024
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve statement conversion over HTTP on this machine.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Address to bind (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to bind (default: {DEFAULT_PORT})")
+    parser.add_argument("--workers", type=int,
+                        help="Conversion worker processes (default: number of CPUs)")
+    parser.add_argument("--max-queue", type=int, default=DEFAULT_MAX_QUEUE,
+                        help=f"Jobs that may wait for a free worker (default: {DEFAULT_MAX_QUEUE})")
+    parser.add_argument("--max-upload-mb", type=int, default=DEFAULT_MAX_UPLOAD_MB,
+                        help=f"Largest accepted upload in MB (default: {DEFAULT_MAX_UPLOAD_MB})")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, args.workers, args.max_queue, args.max_upload_mb)
+    print(f"Serving statement conversion on http://{args.host}:{args.port} "
+          f"with {server.service.workers} worker(s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Statement sources. Every reader yields record batches: pandas DataFrames with
+the columns in RECORD_COLUMNS, so grouping and output only deal with one shape.
+"""
+import os
+import time
+
+from .pdf import parse_page_text, parse_page_layout
+
+RECORD_COLUMNS = ('Date', 'Narration', 'Withdrawal', 'Deposit', 'Balance')
+RECORD_DTYPES = {
+    'Date': 'object',
+    'Narration': 'object',
+    'Withdrawal': 'float64',
+    'Deposit': 'float64',
+    'Balance': 'float64',
+}
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_PAGES_PER_BATCH = 20
+
+
+def to_record_batch(rows):
+    """
+    Build a record batch from a list of transaction dicts.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(rows, columns=list(RECORD_COLUMNS)).astype(RECORD_DTYPES)
+
+
+def find_statement_columns(df):
+    """
+    Identify the narration, withdrawal, deposit, date and balance columns of a statement.
+    Any column that cannot be found is returned as None.
+    """
+    columns = {'narration': None, 'withdrawal': None, 'deposit': None, 'date': None, 'balance': None}
+
+    for col in df.columns:
+        col_lower = str(col).lower()
+        if 'narration' in col_lower or 'description' in col_lower or 'particulars' in col_lower:
+            columns['narration'] = col
+        elif 'withdrawal' in col_lower or 'debit' in col_lower:
+            columns['withdrawal'] = col
+        elif 'deposit' in col_lower or 'credit' in col_lower:
+            columns['deposit'] = col
+        elif 'date' in col_lower:
+            columns['date'] = col
+        elif 'balance' in col_lower:
+            columns['balance'] = col
+
+    return columns
+
+
+def _to_amount(series):
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64')
+    return pd.to_numeric(series.astype(str).str.replace(',', '', regex=False), errors='coerce')
+
+
+def normalize_statement_frame(df, columns):
+    """
+    Convert a tabular statement (Excel/CSV) into a record batch.
+    Returns (batch, stopped) where stopped means the statement summary was reached.
+    """
+    import pandas as pd
+
+    # The first column carries the '****' separators and the summary marker
+    marker = df[df.columns[0]].astype(str)
+    stopped = False
+    summary_rows = marker.str.contains('STATEMENT SUMMARY', regex=False).to_numpy().nonzero()[0]
+    if len(summary_rows):
+        df = df.iloc[:summary_rows[0]]
+        marker = marker.iloc[:summary_rows[0]]
+        stopped = True
+    df = df[~marker.str.contains('****', regex=False)]
+
+    def amounts(col):
+        if not col:
+            return pd.Series(0.0, index=df.index)
+        return _to_amount(df[col]).fillna(0.0)
+
+    batch = pd.DataFrame({
+        'Date': df[columns['date']].astype(str).where(df[columns['date']].notna(), 'NA') if columns['date'] else 'NA',
+        'Narration': df[columns['narration']].astype(str).where(df[columns['narration']].notna(), ''),
+        'Withdrawal': amounts(columns['withdrawal']),
+        'Deposit': amounts(columns['deposit']),
+        'Balance': _to_amount(df[columns['balance']]) if columns['balance'] else float('nan'),
+    }, index=df.index)
+
+    return batch.reset_index(drop=True).astype(RECORD_DTYPES), stopped
+
+
+def _source_size(source):
+    if hasattr(source, 'getbuffer'):
+        return source.getbuffer().nbytes
+    if hasattr(source, 'seek'):
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return size
+    return os.path.getsize(source)
+
+
+def _amount_columns(df):
+    columns = find_statement_columns(df)
+    return [columns[key] for key in ('withdrawal', 'deposit', 'balance') if columns[key]]
+
+
+def _convert_arrow_amounts(record_batch, names):
+    """
+    Parse amount text columns of a pyarrow record batch as float64, the Arrow
+    equivalent of _to_amount: thousands separators are dropped and anything
+    that is not a number becomes null.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arrays = list(record_batch.columns)
+    for name in names:
+        index = record_batch.schema.get_field_index(name)
+        text = pc.utf8_trim_whitespace(pc.replace_substring(arrays[index], ',', ''))
+        is_number = pc.match_substring_regex(text, r'^[-+]?(\d+\.?\d*|\.\d+)$')
+        arrays[index] = pc.cast(pc.if_else(is_number, text, pa.scalar(None, pa.string())), pa.float64())
+    return pa.RecordBatch.from_arrays(arrays, names=record_batch.schema.names)
+
+
+class StatementSource:
+    """
+    Base class for statement readers. Subclasses implement iter_batches().
+    `source` may be a path or a binary file object.
+    """
+
+    def __init__(self, source, batch_size=DEFAULT_BATCH_SIZE):
+        self.source = source
+        self.batch_size = batch_size
+        self.columns = None
+        # Counters picked up by the run metrics
+        self.stats = {'bytes_read': _source_size(source), 'pages': 0, 'lines_dropped': 0, 'page_seconds': 0.0}
+
+    def iter_batches(self):
+        raise NotImplementedError
+
+    def read_all(self):
+        """
+        Read every batch and return a single record DataFrame.
+        """
+        import pandas as pd
+
+        batches = list(self.iter_batches())
+        if not batches:
+            return to_record_batch([])
+        return pd.concat(batches, ignore_index=True)
+
+    def _detect_columns(self, df):
+        self.columns = find_statement_columns(df)
+        if not self.columns['narration']:
+            raise ValueError("Could not automatically find the 'Narration' column. Please ensure your file has a column with a name like 'Narration', 'Description', or 'Particulars'.")
+        return self.columns
+
+
+class PdfSource(StatementSource):
+    """
+    Reads a PDF statement with pdfplumber, one batch per chunk of pages.
+    With reconcile=True each chunk is checked against the running balance and
+    pages around a break, or with lines the pattern rejected, are parsed again
+    with the layout fallback.
+    """
+
+    def __init__(self, source, batch_size=DEFAULT_BATCH_SIZE, pages_per_batch=DEFAULT_PAGES_PER_BATCH,
+                 reconcile=True):
+        super().__init__(source, batch_size)
+        self.pages_per_batch = pages_per_batch
+        self.reconcile = reconcile
+        self.reconciliation = {
+            'breaks_found': 0,
+            'pages_reparsed': [],
+            'unresolved_breaks': 0,
+            'lines_dropped': 0,
+            'lines_recovered': 0,
+        }
+        # Withdrawal/Deposit header positions, carried to later pages without a header
+        self._layout_columns = None
+
+    def _reparse_page(self, page, previous_balance):
+        rows, columns = parse_page_layout(page, previous_balance, self._layout_columns)
+        self._layout_columns = columns
+        return rows
+
+    def iter_page_chunks(self, start_page=0, previous_balance=None):
+        """
+        Yield (next_page, batch) for each chunk of pages from start_page onwards.
+        next_page is where a resumed read should continue after this chunk, and
+        previous_balance is the closing balance of the row before start_page.
+
+        When reconciling, the last page of a chunk is held back and checked again
+        with the next chunk: a row dropped from the end of it only shows up as a
+        break on the following page.
+
+        Pages are fast-parsed in one chain, each from the fast-parse balance of
+        the page before, and breaks_found counts the breaks in that chain. Both
+        are the same whatever pages_per_batch is.
+        """
+        import pdfplumber
+        from .reconcile import find_balance_breaks, reconcile_page_rows
+
+        with pdfplumber.open(self.source) as pdf:
+            page_count = len(pdf.pages)
+            # (page number, page, rows, rejected lines not yet recovered)
+            held = None
+            # Fast-parse rows of the held page, and the fast-parse balance before it
+            held_fast = []
+            fast_opening = previous_balance
+            fast_balance = previous_balance
+            for chunk_start in range(start_page, page_count, self.pages_per_batch):
+                chunk_end = min(chunk_start + self.pages_per_batch, page_count)
+                chunk_started = time.monotonic()
+
+                entries = [held] if held else []
+                fast_rows = list(held_fast)
+                # (fast-parse balance before the page, fast-parse rows) per new page
+                fast_pages = []
+                for number in range(chunk_start, chunk_end):
+                    page = pdf.pages[number]
+                    page_stats = {'lines_dropped': 0}
+                    rows = parse_page_text(page.extract_text(), fast_balance, page_stats)
+                    fast_pages.append((fast_balance, rows))
+                    entries.append((number, page, rows, page_stats['lines_dropped']))
+                    fast_rows.extend(rows)
+                    self.stats['lines_dropped'] += page_stats['lines_dropped']
+                    if rows:
+                        fast_balance = rows[-1]['Balance']
+                self.stats['pages'] += chunk_end - chunk_start
+
+                last_chunk = chunk_end == page_count
+                keep = len(entries) if last_chunk or not self.reconcile else len(entries) - 1
+                if self.reconcile:
+                    page_rows, report = reconcile_page_rows(
+                        [entry[2] for entry in entries],
+                        lambda index, balance: self._reparse_page(entries[index][1], balance),
+                        previous_balance,
+                        [entry[3] for entry in entries],
+                    )
+                    # A held page was counted with the chunk it was parsed in, and
+                    # is only settled with the chunk after it
+                    breaks = find_balance_breaks(to_record_batch(fast_rows), fast_opening)
+                    self.reconciliation['breaks_found'] += int((breaks >= len(held_fast)).sum())
+                    self.reconciliation['unresolved_breaks'] += sum(report['unresolved_by_page'][:keep])
+                    self.reconciliation['lines_dropped'] += report['lines_dropped'] - (held[3] if held else 0)
+                    self.reconciliation['lines_recovered'] += report['lines_recovered']
+                    for index in report['pages_reparsed']:
+                        if entries[index][0] not in self.reconciliation['pages_reparsed']:
+                            self.reconciliation['pages_reparsed'].append(entries[index][0])
+                    entries = [
+                        (number, page, rows, dropped - recovered)
+                        for (number, page, _, dropped), rows, recovered
+                        in zip(entries, page_rows, report['recovered_by_page'])
+                    ]
+                self.stats['page_seconds'] += time.monotonic() - chunk_started
+
+                held = None if keep == len(entries) else entries[keep]
+                if held:
+                    # The held page is always the last page parsed in this chunk
+                    fast_opening, held_fast = fast_pages[-1]
+                else:
+                    fast_opening, held_fast = fast_balance, []
+                # Release the parsed layout objects before the next chunk
+                for _, page, _, _ in entries[:keep]:
+                    page.close()
+
+                rows = [row for entry in entries[:keep] for row in entry[2]]
+                if rows:
+                    previous_balance = rows[-1]['Balance']
+                next_page = held[0] if held else chunk_end
+                yield next_page, to_record_batch(rows)
+
+    def iter_batches(self):
+        for _, batch in self.iter_page_chunks():
+            if len(batch):
+                yield batch
+
+
+class ExcelSource(StatementSource):
+    """
+    Reads an XLSX/XLS statement. The bank export has 20 banner rows above the header.
+    """
+
+    def __init__(self, source, batch_size=DEFAULT_BATCH_SIZE, skiprows=20):
+        super().__init__(source, batch_size)
+        self.skiprows = skiprows
+
+    def iter_batches(self):
+        import pandas as pd
+
+        df = pd.read_excel(self.source, skiprows=self.skiprows)
+        batch, _ = normalize_statement_frame(df, self._detect_columns(df))
+        for start in range(0, len(batch), self.batch_size):
+            yield batch.iloc[start:start + self.batch_size].reset_index(drop=True)
+
+
+class CsvSource(StatementSource):
+    """
+    Reads a CSV export in batches. Uses pyarrow's multithreaded streaming reader
+    when it is installed, otherwise falls back to chunked pandas.read_csv.
+    """
+
+    def __init__(self, source, batch_size=DEFAULT_BATCH_SIZE, skiprows=0):
+        super().__init__(source, batch_size)
+        self.skiprows = skiprows
+
+    def _open_arrow_reader(self, pa_csv, column_types=None):
+        if hasattr(self.source, 'seek'):
+            self.source.seek(0)
+        return pa_csv.open_csv(
+            self.source,
+            read_options=pa_csv.ReadOptions(use_threads=True, skip_rows=self.skiprows),
+            convert_options=pa_csv.ConvertOptions(strings_can_be_null=True, column_types=column_types),
+        )
+
+    def _raw_chunks(self):
+        try:
+            import pyarrow as pa
+            from pyarrow import csv as pa_csv
+        except ImportError:
+            pa_csv = None
+
+        if pa_csv is not None:
+            # The streaming reader infers types from the first block only, so read
+            # every column as text and convert the amount columns per batch
+            schema = self._open_arrow_reader(pa_csv).schema
+            amount_columns = _amount_columns(schema.empty_table().to_pandas())
+            column_types = {field.name: pa.string() for field in schema}
+            for record_batch in self._open_arrow_reader(pa_csv, column_types):
+                record_batch = _convert_arrow_amounts(record_batch, amount_columns)
+                for start in range(0, record_batch.num_rows, self.batch_size):
+                    yield record_batch.slice(start, self.batch_size).to_pandas()
+        else:
+            import pandas as pd
+
+            yield from pd.read_csv(self.source, skiprows=self.skiprows, chunksize=self.batch_size)
+
+    def iter_batches(self):
+        for chunk in self._raw_chunks():
+            if self.columns is None:
+                self._detect_columns(chunk)
+            batch, stopped = normalize_statement_frame(chunk, self.columns)
+            if len(batch):
+                yield batch
+            if stopped:
+                break
+
+
+SOURCES = {
+    '.pdf': PdfSource,
+    '.xlsx': ExcelSource,
+    '.xls': ExcelSource,
+    '.csv': CsvSource,
+}
+
+
+def open_source(source, name=None, **kwargs):
+    """
+    Return the reader for a statement, chosen by file extension.
+    Pass `name` when `source` is a file object (e.g. a Streamlit upload).
+    """
+    name = name or str(source)
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in SOURCES:
+        raise ValueError(f"Unsupported statement format '{extension}'. Expected one of: {', '.join(SOURCES)}")
+    return SOURCES[extension](source, **kwargs)